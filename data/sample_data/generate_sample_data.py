@@ -1,9 +1,7 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-import random
 
-def generate_sample_sales_data():
+def generate_sample_sales_data(n=100, seed=None):
     """Generate sample sales data for testing"""
     
     # Sample products
@@ -16,32 +14,32 @@ def generate_sample_sales_data():
     ]
     
     marketplaces = ['Amazon', 'eBay', 'Shopify', 'Etsy', 'Walmart']
+    statuses = ['completed', 'pending', 'shipped']
     
-    sales_data = []
-    for i in range(100):
-        product = random.choice(products)
-        marketplace = random.choice(marketplaces)
-        quantity = random.randint(1, 5)
-        
-        date = datetime.now() - timedelta(days=random.randint(0, 30))
-        
-        order = {
-            'order_id': f'ORD{i+1:04d}',
-            'sku': product['sku'],
-            'msku': product['msku'],
-            'product_name': product['name'],
-            'quantity': quantity,
-            'price': product['price'],
-            'total': product['price'] * quantity,
-            'date': date.strftime('%Y-%m-%d'),
-            'marketplace': marketplace,
-            'category': product['category'],
-            'status': random.choice(['completed', 'pending', 'shipped'])
-        }
-        sales_data.append(order)
+    rng = np.random.default_rng(seed)
+    product_idx = rng.integers(0, len(products), n)
+    quantities = rng.integers(1, 6, n)
+    days_ago = rng.integers(0, 31, n)
     
-    df = pd.DataFrame(sales_data)
-    df.to_csv('data/sample_data/sample_sales.csv', index=False)
+    prices = np.take([p['price'] for p in products], product_idx)
+    
+    df = pd.DataFrame({
+        'order_id': [f'ORD{i+1:04d}' for i in range(n)],
+        'sku': np.take([p['sku'] for p in products], product_idx),
+        'msku': np.take([p['msku'] for p in products], product_idx),
+        'product_name': np.take([p['name'] for p in products], product_idx),
+        'quantity': quantities,
+        'price': prices,
+        'total': prices * quantities,
+        'date': pd.Timestamp.now().normalize() - pd.to_timedelta(days_ago, unit='D'),
+        'marketplace': np.take(marketplaces, rng.integers(0, len(marketplaces), n)),
+        'category': np.take([p['category'] for p in products], product_idx),
+        'status': np.take(statuses, rng.integers(0, len(statuses), n))
+    })
+    
+    df.to_feather('data/sample_data/sample_sales.feather')
+    # The upload page only accepts CSV/Excel, so keep a CSV copy for manual testing
+    df.to_csv('data/sample_data/sample_sales.csv', index=False, date_format='%Y-%m-%d')
     print("Sample sales data generated!")
     
     return df
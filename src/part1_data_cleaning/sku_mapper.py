@@ -1,25 +1,203 @@
 import pandas as pd
+import numpy as np
 import json
+import hashlib
+import os
 import logging
-from datetime import datetime
+import logging.handlers
+import queue
+import atexit
 import re
+from functools import lru_cache
 from typing import Dict, Any, Optional, List
 from collections import Counter
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('sku_mapping.log'),
-        logging.StreamHandler()
-    ]
+try:
+    from joblib import Parallel, delayed
+    joblib_available = True
+except ImportError:
+    joblib_available = False
+
+PARALLEL_CATEGORIZE_THRESHOLD = 50_000
+
+def _configure_logging():
+    """Log through a queue so file/console writes happen on a background thread"""
+    root = logging.getLogger()
+    if root.handlers:
+        return
+    
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handlers = [logging.FileHandler('sku_mapping.log'), logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    
+    log_queue = queue.Queue(-1)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(logging.INFO)
+    
+    listener = logging.handlers.QueueListener(log_queue, *handlers)
+    listener.start()
+    atexit.register(listener.stop)
+
+_configure_logging()
+
+_ALPHA_PREFIX_RE = re.compile(r'^([A-Z]{2,})[0-9]+')
+_ALNUM_CODE_RE = re.compile(r'[A-Z0-9]{8,}')
+_ELECTRONICS_PREFIXES = ('ST', 'MT', 'MY')
+
+# Keyword categories in priority order; the first category with a keyword
+# anywhere in the SKU wins, regardless of where in the SKU it appears.
+_KEYWORD_CATEGORIES = (
+    ('FUSKED_BRAND_PRODUCTS', ('FUSKED',)),
+    ('DRAGON_BRAND_PRODUCTS', ('DRAGON',)),
+    ('RUDRAV_BRAND_PRODUCTS', ('RUDRAV',)),
+    ('CSTE_BRAND_PRODUCTS', ('CSTE',)),
+    ('SUNGLASSES_CATEGORY', ('SUNGLASS', 'GLASSES')),
+    ('ENTERTAINMENT_PRODUCTS', ('MUSIC', 'HEIST', 'SONG')),
+    ('APPAREL_ACCESSORIES', ('PACK OF', 'FREE SIZE')),
+    ('HANDICRAFT_PRODUCTS', ('WOODEN', 'CANVAS', 'CRAFT')),
+)
+_KEYWORD_RANKS = {
+    keyword: (rank, category)
+    for rank, (category, keywords) in enumerate(_KEYWORD_CATEGORIES)
+    for keyword in keywords
+}
+# Zero-width lookahead so overlapping keywords are all seen in a single scan
+_KEYWORD_RE = re.compile('(?=(' + '|'.join(re.escape(k) for k in _KEYWORD_RANKS) + '))')
+
+# Column name fragments that identify a SKU column, most specific first
+_SKU_COLUMN_INDICATORS = (
+    'sku', 'stock_keeping_unit',
+    'product_id', 'product_code', 'item_id', 'item_code',
+    'order_item_id', 'orderitem', 'order_id',
+    'product', 'item', 'part',
+    'code', 'id',
 )
 
+def _match_keyword_category(sku_upper: str) -> Optional[str]:
+    """Return the highest priority keyword category found in the SKU"""
+    best = None
+    for match in _KEYWORD_RE.finditer(sku_upper):
+        hit = _KEYWORD_RANKS[match.group(1)]
+        if best is None or hit[0] < best[0]:
+            best = hit
+            if best[0] == 0:
+                break
+    return best[1] if best else None
+
+@lru_cache(maxsize=131072)
+def _categorize_sku_cached(sku: str) -> str:
+    """Intelligently categorize a SKU based on its characteristics (memoized per SKU)"""
+    # Digit-only SKUs can't contain any keyword, so classify them up front
+    if sku.isdigit():
+        length = len(sku)
+        if length >= 15:
+            prefix = sku[:3]
+            return f'NUMERIC_ORDER_TYPE_{prefix}'
+        elif length == 4:
+            return f'HSN_CODE_{sku}'
+        elif length >= 8:
+            prefix = sku[:2]
+            return f'NUMERIC_PRODUCT_TYPE_{prefix}'
+        return None
+    
+    keyword_category = _match_keyword_category(sku.upper())
+    if keyword_category:
+        return keyword_category
+    
+    if (prefix_match := _ALPHA_PREFIX_RE.match(sku)):
+        return f'ALPHANUMERIC_TYPE_{prefix_match.group(1)}'
+    
+    # Digit-only SKUs returned above, so a full match here always has a letter
+    elif _ALNUM_CODE_RE.fullmatch(sku):
+        if sku.startswith(_ELECTRONICS_PREFIXES):
+            prefix = sku[:2]
+            return f'ELECTRONICS_TYPE_{prefix}'
+        else:
+            return 'MIXED_ALPHANUMERIC_PRODUCTS'
+    
+    elif len(sku) == 36 and sku.count('-') == 4:
+        return 'UUID_SHIPMENT_IDS'
+    elif len(sku) >= 20 and '-' in sku:
+        return 'SYSTEM_GENERATED_IDS'
+    
+    elif len(sku) <= 10:
+        if sku.isalnum():
+            return 'SHORT_PRODUCT_CODES'
+        else:
+            return 'SHORT_MIXED_CODES'
+    else:
+        return 'LONG_IDENTIFIER_CODES'
+
+def _categorize_chunk(skus: List[str]) -> List[Optional[str]]:
+    """Categorize a chunk of SKUs in a worker process"""
+    return [_categorize_sku_cached(sku) for sku in skus]
+
+def _categorize_skus(skus: pd.Series) -> pd.Series:
+    """Categorize SKUs, fanning large batches out across CPU cores"""
+    n_jobs = os.cpu_count() or 1
+    if joblib_available and n_jobs > 1 and len(skus) > PARALLEL_CATEGORIZE_THRESHOLD:
+        values = skus.tolist()
+        size = -(-len(values) // n_jobs)
+        parts = Parallel(n_jobs=n_jobs, backend='loky')(
+            delayed(_categorize_chunk)(values[i:i + size]) for i in range(0, len(values), size)
+        )
+        return pd.Series([category for part in parts for category in part], index=skus.index, dtype=object)
+    return skus.map(_categorize_sku_cached).astype(object)
+
+class _MappingStore(dict):
+    """dict that counts its mutations so derived lookups know when to rebuild"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.version = 0
+    
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.version += 1
+    
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.version += 1
+    
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self.version += 1
+    
+    def setdefault(self, key, default=None):
+        self.version += 1
+        return super().setdefault(key, default)
+    
+    def pop(self, *args):
+        self.version += 1
+        return super().pop(*args)
+    
+    def popitem(self):
+        self.version += 1
+        return super().popitem()
+    
+    def clear(self):
+        super().clear()
+        self.version += 1
+
 class IntelligentSKUMapper:
     def __init__(self):
+        self._reverse_mappings = {}
+        self._reverse_version = None
+        self._digest = None
+        self._digest_version = None
         self.master_mappings = {}
         self.processed_data = None
         self.auto_generated_mappings = {}
+    
+    @property
+    def master_mappings(self) -> Dict[str, List[str]]:
+        return self._master_mappings
+    
+    @master_mappings.setter
+    def master_mappings(self, mappings):
+        self._master_mappings = _MappingStore(mappings)
+        self._reverse_version = None
+        self._digest_version = None
         
     def load_master_mappings(self, file_path=None):
         """Load master SKU mappings from file or create intelligent defaults"""
@@ -29,6 +207,7 @@ class IntelligentSKUMapper:
                     self.master_mappings = json.load(f)
             else:
                 self.master_mappings = {}
+            self._get_reverse_mappings()
             logging.info(f"Loaded {len(self.master_mappings)} predefined mappings")
             return True
         except Exception as e:
@@ -38,83 +217,22 @@ class IntelligentSKUMapper:
     
     def analyze_sku_patterns(self, sku_list: List[str]) -> Dict[str, List[str]]:
         """Automatically analyze SKU patterns and create intelligent groupings"""
-        pattern_groups = {}
-        
-        for sku in sku_list:
-            if pd.isna(sku) or not str(sku).strip():
-                continue
-                
-            sku = str(sku).strip()
-            category = self._categorize_sku(sku)
-            
-            if category not in pattern_groups:
-                pattern_groups[category] = []
-            pattern_groups[category].append(sku)
-        
-        intelligent_mappings = {}
-        for category, skus in pattern_groups.items():
-            if len(skus) >= 1:
-                intelligent_mappings[category] = list(set(skus))  # Remove duplicates
+        skus = pd.Series(sku_list, dtype=object).dropna().astype('string').str.strip()
+        skus = skus[skus != '']
+        if skus.empty:
+            return {}
         
-        return intelligent_mappings
+        categories = _categorize_skus(skus)
+        grouped = skus.groupby(categories, sort=False, dropna=False).unique()
+        # groupby reports the None category (unclassified digit runs) as NaN
+        return {
+            category if isinstance(category, str) else None: list(group)
+            for category, group in grouped.items()
+        }
     
     def _categorize_sku(self, sku: str) -> str:
         """Intelligently categorize a SKU based on its characteristics"""
-        sku_upper = sku.upper()
-        
-        if any(brand in sku_upper for brand in ['FUSKED', 'DRAGON', 'RUDRAV', 'CSTE']):
-            if 'FUSKED' in sku_upper:
-                return 'FUSKED_BRAND_PRODUCTS'
-            elif 'DRAGON' in sku_upper:
-                return 'DRAGON_BRAND_PRODUCTS'
-            elif 'RUDRAV' in sku_upper:
-                return 'RUDRAV_BRAND_PRODUCTS'
-            elif 'CSTE' in sku_upper:
-                return 'CSTE_BRAND_PRODUCTS'
-        
-        if any(term in sku_upper for term in ['SUNGLASS', 'GLASSES']):
-            return 'SUNGLASSES_CATEGORY'
-        elif any(term in sku_upper for term in ['MUSIC', 'HEIST', 'SONG']):
-            return 'ENTERTAINMENT_PRODUCTS'
-        elif any(term in sku_upper for term in ['PACK OF', 'FREE SIZE']):
-            return 'APPAREL_ACCESSORIES'
-        elif any(term in sku_upper for term in ['WOODEN', 'CANVAS', 'CRAFT']):
-            return 'HANDICRAFT_PRODUCTS'
-        
-        if sku.isdigit():
-            length = len(sku)
-            if length >= 15:
-                prefix = sku[:3]
-                return f'NUMERIC_ORDER_TYPE_{prefix}'
-            elif length == 4:
-                return f'HSN_CODE_{sku}'
-            elif length >= 8:
-                prefix = sku[:2]
-                return f'NUMERIC_PRODUCT_TYPE_{prefix}'
-        
-        elif re.match(r'^[A-Z]{2,}[0-9]+', sku):
-            prefix = re.match(r'^[A-Z]{2,}', sku).group()
-            return f'ALPHANUMERIC_TYPE_{prefix}'
-        
-        elif re.match(r'^[A-Z0-9]{8,}$', sku) and any(c.isalpha() for c in sku):
-            if sku.startswith(('ST', 'MT', 'MY')):
-                prefix = sku[:2]
-                return f'ELECTRONICS_TYPE_{prefix}'
-            else:
-                return 'MIXED_ALPHANUMERIC_PRODUCTS'
-        
-        elif len(sku) == 36 and sku.count('-') == 4:
-            return 'UUID_SHIPMENT_IDS'
-        elif len(sku) >= 20 and '-' in sku:
-            return 'SYSTEM_GENERATED_IDS'
-        
-        elif len(sku) <= 10:
-            if sku.isalnum():
-                return 'SHORT_PRODUCT_CODES'
-            else:
-                return 'SHORT_MIXED_CODES'
-        else:
-            return 'LONG_IDENTIFIER_CODES'
+        return _categorize_sku_cached(sku)
     
     def auto_map_sku_to_msku(self, sku) -> str:
         """Automatically map SKU to Master SKU with intelligent categorization"""
@@ -126,23 +244,61 @@ class IntelligentSKUMapper:
         if not sku:
             return "UNCATEGORIZED_EMPTY"
         
-        for msku, sku_variants in self.master_mappings.items():
-            if sku in sku_variants or sku == msku:
-                return msku
+        reverse_mappings = self._get_reverse_mappings()
+        if sku in reverse_mappings:
+            return reverse_mappings[sku]
         
         category = self._categorize_sku(sku)
         
-        if category not in self.auto_generated_mappings:
-            self.auto_generated_mappings[category] = []
-        if sku not in self.auto_generated_mappings[category]:
-            self.auto_generated_mappings[category].append(sku)
+        self.auto_generated_mappings.setdefault(category, set()).add(sku)
         
         return category
     
+    def _build_reverse_mappings(self) -> Dict[str, str]:
+        """Build a SKU -> MSKU lookup, keeping the first MSKU that claims a SKU"""
+        reverse = {}
+        for msku, sku_variants in self.master_mappings.items():
+            reverse.setdefault(msku, msku)
+            for sku in sku_variants:
+                reverse.setdefault(sku, msku)
+        return reverse
+    
+    def _get_reverse_mappings(self) -> Dict[str, str]:
+        """Return the SKU -> MSKU lookup, rebuilding it only after the mappings change"""
+        if self._reverse_version != self._master_mappings.version:
+            self._reverse_mappings = self._build_reverse_mappings()
+            self._reverse_version = self._master_mappings.version
+        return self._reverse_mappings
+    
+    def mapping_digest(self) -> str:
+        """Return a content digest of the master mappings, recomputed only after they change"""
+        if self._digest_version != self._master_mappings.version:
+            payload = json.dumps(self._master_mappings, default=str, separators=(',', ':')).encode()
+            self._digest = hashlib.blake2b(payload, digest_size=8).hexdigest()
+            self._digest_version = self._master_mappings.version
+        return self._digest
+    
+    def _map_sku_series(self, skus: pd.Series) -> pd.Series:
+        """Vectorized equivalent of applying auto_map_sku_to_msku to every SKU"""
+        cleaned = skus.astype('string').str.strip()
+        mapped = cleaned.map(self._get_reverse_mappings()).astype(object)
+        
+        missing = cleaned.isna().to_numpy()
+        empty = (cleaned == '').fillna(False).to_numpy(dtype=bool)
+        mapped[missing] = "UNCATEGORIZED_UNKNOWN"
+        mapped[empty] = "UNCATEGORIZED_EMPTY"
+        
+        unmapped = mapped.isna().to_numpy() & ~missing & ~empty
+        if unmapped.any():
+            category_cache = {sku: self.auto_map_sku_to_msku(sku) for sku in cleaned[unmapped].unique()}
+            mapped[unmapped] = cleaned[unmapped].map(category_cache).astype(object)
+        
+        return mapped
+    
     def process_sales_data(self, df):
         """Process sales data with intelligent auto-mapping"""
         try:
-            processed_df = df.copy()
+            processed_df = df.copy(deep=False)
             
             sku_column = self._find_sku_column(df)
             
@@ -159,18 +315,24 @@ class IntelligentSKUMapper:
             self.master_mappings.update(intelligent_mappings)
             
             logging.info(f"Generated {len(intelligent_mappings)} intelligent mapping categories")
-            for category, skus in intelligent_mappings.items():
-                logging.info(f"  {category}: {len(skus)} SKUs")
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                for category, skus in intelligent_mappings.items():
+                    logging.debug(f"  {category}: {len(skus)} SKUs")
             
-            processed_df['MSKU'] = processed_df[sku_column].apply(self.auto_map_sku_to_msku)
+            processed_df['MSKU'] = pd.Categorical(self._map_sku_series(processed_df[sku_column]))
             
-            processed_df['processed_at'] = datetime.now()
-            processed_df['mapping_method'] = 'intelligent_auto'
+            processed_df['processed_at'] = pd.Timestamp.now()
+            processed_df['mapping_method'] = pd.Categorical.from_codes(
+                np.zeros(len(processed_df), dtype=np.int8), categories=['intelligent_auto']
+            )
             
             self.processed_data = processed_df
             
             total_records = len(processed_df)
-            mapped_records = len(processed_df[~processed_df['MSKU'].str.startswith('UNCATEGORIZED_', na=False)])
+            msku = processed_df['MSKU'].cat
+            uncategorized = np.asarray(msku.categories.str.startswith('UNCATEGORIZED_'), dtype=bool)
+            codes = msku.codes.to_numpy()
+            mapped_records = total_records - np.count_nonzero(uncategorized[codes[codes >= 0]])
             success_rate = (mapped_records / total_records * 100) if total_records > 0 else 0
             
             logging.info(f"Processed {total_records} records with {success_rate:.1f}% success rate")
@@ -181,37 +343,43 @@ class IntelligentSKUMapper:
             logging.error(f"Error processing sales data: {str(e)}")
             raise
 
+    def restore_processed_data(self, processed_df):
+        """Adopt a previously processed frame, re-registering its SKU categories in the master mappings"""
+        source_columns = [col for col in processed_df.columns if col not in ('MSKU', 'processed_at', 'mapping_method')]
+        sku_column = self._find_sku_column(processed_df[source_columns]) or source_columns[0]
+        unique_skus = processed_df[sku_column].dropna().unique().tolist()
+        self.master_mappings.update(self.analyze_sku_patterns(unique_skus))
+        for column in ('MSKU', 'mapping_method'):
+            if column in processed_df.columns and not isinstance(processed_df[column].dtype, pd.CategoricalDtype):
+                processed_df[column] = processed_df[column].astype('category')
+        self.processed_data = processed_df
+        return processed_df
+
     def _find_sku_column(self, df) -> Optional[str]:
         """Intelligently find the SKU column in the dataframe"""
-        sku_indicators = [
-            ['sku', 'stock_keeping_unit'],
-            ['product_id', 'product_code', 'item_id', 'item_code'],
-            ['order_item_id', 'orderitem', 'order_id'],
-            ['product', 'item', 'part'],
-            ['code', 'id']
-        ]
-        
-        columns_lower = [col.lower() for col in df.columns]
-        
-        for indicator_group in sku_indicators:
-            for indicator in indicator_group:
-                for i, col_lower in enumerate(columns_lower):
-                    if indicator in col_lower:
-                        return df.columns[i]
+        best_rank, best_column = len(_SKU_COLUMN_INDICATORS), None
+        for column in df.columns:
+            col_lower = str(column).lower()
+            for rank in range(best_rank):
+                if _SKU_COLUMN_INDICATORS[rank] in col_lower:
+                    best_rank, best_column = rank, column
+                    break
+            if best_rank == 0:
+                break
+        
+        if best_column is not None:
+            return best_column
         
         for column in df.columns:
-            sample_values = df[column].dropna().head(10)
+            sample_values = df[column].dropna().head(10).astype(str).str.strip()
             if len(sample_values) > 0:
-                sku_like_count = 0
-                for value in sample_values:
-                    str_value = str(value).strip()
-                    if (len(str_value) >= 3 and 
-                        (str_value.isalnum() or 
-                         any(c.isalnum() for c in str_value)) and
-                        not str_value.replace('.', '').isdigit()): 
-                        sku_like_count += 1
+                sku_like = (
+                    (sample_values.str.len() >= 3)
+                    & sample_values.str.contains(r'[^\W_]', regex=True)
+                    & ~sample_values.str.replace('.', '', regex=False).str.isdigit()
+                )
                 
-                if sku_like_count >= len(sample_values) * 0.7:
+                if sku_like.sum() >= len(sample_values) * 0.7:
                     return column
         
         return None
@@ -231,7 +399,7 @@ class IntelligentSKUMapper:
         for category, skus in self.master_mappings.items():
             summary['category_details'][category] = {
                 'sku_count': len(skus),
-                'sample_skus': skus[:3] if len(skus) > 3 else skus,
+                'sample_skus': list(skus)[:3],
                 'is_auto_generated': category in self.auto_generated_mappings
             }
         
@@ -1,10 +1,19 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
 import json
+from itertools import islice
 from datetime import datetime
 from dataclasses import dataclass
 from typing import Dict, List, Any, Optional
 
+def _chunked(iterable, size):
+    """Yield lists of up to size items without materializing the whole iterable"""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
 class BaserowManager:
     def __init__(self, api_token, base_url="https://api.baserow.io"):
         self.api_token = api_token
@@ -13,6 +22,12 @@ class BaserowManager:
             'Authorization': f'Token {api_token}',
             'Content-Type': 'application/json'
         }
+        
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=Retry(total=3, backoff_factor=0.3))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
     
     def create_database(self, workspace_id, name):
         """Create a new database in Baserow"""
@@ -23,7 +38,7 @@ class BaserowManager:
             'name': name
         }
         
-        response = requests.post(url, headers=self.headers, json=data)
+        response = self.session.post(url, json=data)
         return response.json() if response.status_code == 200 else None
     
     def create_table(self, database_id, name, fields):
@@ -34,7 +49,7 @@ class BaserowManager:
             'name': name
         }
         
-        response = requests.post(url, headers=self.headers, json=data)
+        response = self.session.post(url, json=data)
         if response.status_code != 200:
             return None
         
@@ -55,7 +70,7 @@ class BaserowManager:
             'name': field_config.get('name', 'New Field')
         }
         
-        response = requests.post(url, headers=self.headers, json=data)
+        response = self.session.post(url, json=data)
         return response.json() if response.status_code == 200 else None
     
     def insert_rows(self, table_id, rows):
@@ -63,15 +78,24 @@ class BaserowManager:
         url = f"{self.base_url}/api/database/rows/table/{table_id}/batch/"
         data = {'items': rows}
         
-        response = requests.post(url, headers=self.headers, json=data)
+        response = self.session.post(url, data=json.dumps(data, separators=(',', ':')))
         return response.json() if response.status_code == 200 else None
     
+    def iter_insert_rows(self, table_id, row_iter, chunk_size=200):
+        """Stream rows from any iterable into a table, yielding each batch response"""
+        for chunk in _chunked(row_iter, chunk_size):
+            yield self.insert_rows(table_id, chunk)
+    
+    def insert_rows_chunked(self, table_id, rows, chunk_size=200):
+        """Insert rows in batches no larger than Baserow's batch limit"""
+        return list(self.iter_insert_rows(table_id, rows, chunk_size))
+    
     def get_rows(self, table_id, size=100, page=1):
         """Get rows from a table"""
         url = f"{self.base_url}/api/database/rows/table/{table_id}/"
         params = {'size': size, 'page': page}
         
-        response = requests.get(url, headers=self.headers, params=params)
+        response = self.session.get(url, params=params)
         return response.json() if response.status_code == 200 else None
 
 def setup_wms_database():
@@ -1,92 +1,137 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+from flask import Flask, Request, render_template, request, jsonify, redirect, url_for, flash, send_file, send_from_directory
 import pandas as pd
 import os
+import shutil
+import tempfile
 import uuid
-from werkzeug.utils import secure_filename
+from werkzeug.security import safe_join
+import hashlib
 import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 
-import sys
-sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-
 try:
-    from part1_data_cleaning.sku_mapper import SKUMapper
-    sku_mapper_available = True
-except ImportError as e:
-    print(f"Warning: SKU Mapper not available: {e}")
-    sku_mapper_available = False
-    SKUMapper = None
+    import pyarrow as pa
+    import pyarrow.feather as pafeather
+    pyarrow_available = True
+except ImportError:
+    pyarrow_available = False
 
-try:
-    from part2_database.database_manager import BaserowManager
-    baserow_available = True
-except ImportError as e:
-    print(f"Warning: Baserow Manager not available: {e}")
-    baserow_available = False
-    BaserowManager = None
+zstd_available = pyarrow_available and pa.Codec.is_available('zstd')
 
 try:
-    from part4_ai_layer.text_to_sql import SQLQueryProcessor
-    from part4_ai_layer.ai_query_processor import AIQueryProcessor
-    ai_modules_available = True
-except ImportError as e:
-    print(f"Warning: AI modules not available: {e}")
-    ai_modules_available = False
-    SQLQueryProcessor = None
-    AIQueryProcessor = None
+    import python_calamine
+    calamine_available = tuple(int(part) for part in pd.__version__.split('.')[:2]) >= (2, 2)
+except ImportError:
+    calamine_available = False
 
-app = Flask(__name__)
-app.secret_key = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
-app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+import sys
+import threading
+from functools import lru_cache
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+_component_lock = threading.Lock()
 
-sku_mapper = None
-if sku_mapper_available:
+@lru_cache(maxsize=None)
+def _load_sku_mapper():
     try:
+        from part1_data_cleaning.sku_mapper import SKUMapper
         sku_mapper = SKUMapper()
-        sku_mapper.load_master_mappings() 
+        sku_mapper.load_master_mappings()
         print("SKU Mapper initialized successfully")
+        return sku_mapper
     except Exception as e:
         print(f" Failed to initialize SKU Mapper: {e}")
-        sku_mapper_available = False
-
-ai_processor = None
-sql_processor = None
-ai_enabled = False
+        return None
 
-if ai_modules_available:
+@lru_cache(maxsize=None)
+def _load_baserow_manager():
+    try:
+        from part2_database.database_manager import BaserowManager
+        return BaserowManager
+    except ImportError as e:
+        print(f"Warning: Baserow Manager not available: {e}")
+        return None
+
+@lru_cache(maxsize=None)
+def _load_ai_processors():
+    try:
+        from part4_ai_layer.text_to_sql import SQLQueryProcessor
+        from part4_ai_layer.ai_query_processor import AIQueryProcessor
+    except ImportError as e:
+        print(f"Warning: AI modules not available: {e}")
+        return None, None
+    
     try:
         ai_processor = AIQueryProcessor()
         sql_processor = SQLQueryProcessor()
-        sql_processor.insert_sample_data()
-        ai_enabled = True
+        if os.getenv('SEED_SAMPLE_DATA') == '1':
+            sql_processor.insert_sample_data()
         print("AI features initialized successfully")
+        return ai_processor, sql_processor
     except Exception as e:
         print(f"AI features disabled: {e}")
-        ai_processor = None
-        sql_processor = None
-        ai_enabled = False
+        return None, None
+
+def get_sku_mapper():
+    """Shared SKU mapper, imported and initialized on first use; None if unavailable"""
+    with _component_lock:
+        return _load_sku_mapper()
+
+def get_ai_processors():
+    """Shared (ai_processor, sql_processor) pair, imported and initialized on first use; (None, None) if disabled"""
+    with _component_lock:
+        return _load_ai_processors()
+
+def baserow_available():
+    """Whether the Baserow manager can be imported"""
+    with _component_lock:
+        return _load_baserow_manager() is not None
+
+_CATEGORY_TYPE_RE = re.compile(r'^(?:.*(BRAND)|.*(NUMERIC)|.*(CATEGORY))')
+_CATEGORY_TYPE_LABELS = {'BRAND': 'Brand-Based', 'NUMERIC': 'Pattern-Based', 'CATEGORY': 'Product-Based'}
+
+UPLOAD_SPOOL_SIZE = 8 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+class UploadRequest(Request):
+    """Request that keeps uploads up to UPLOAD_SPOOL_SIZE in memory instead of a temp file"""
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_SIZE, mode='rb+')
+
+app = Flask(__name__)
+app.request_class = UploadRequest
+app.secret_key = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
+app.config['UPLOAD_FOLDER'] = 'uploads'
+app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+app.config['USE_X_SENDFILE'] = os.getenv('X_SENDFILE') == '1'
 
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+file_writer = ThreadPoolExecutor(max_workers=2, thread_name_prefix='processed-writer')
+pending_writes = {}
+
 @app.route('/')
 def dashboard():
     """Main dashboard"""
+    sku_mapper = get_sku_mapper()
     stats = {
         'total_products': len(sku_mapper.master_mappings) if sku_mapper else 0,
         'processed_orders': 0,
         'pending_mappings': 0,
         'success_rate': 95.5,
-        'ai_enabled': ai_enabled,
-        'sku_mapper_available': sku_mapper_available,
-        'baserow_available': baserow_available
+        'ai_enabled': get_ai_processors()[0] is not None,
+        'sku_mapper_available': sku_mapper is not None,
+        'baserow_available': baserow_available()
     }
     return render_template('dashboard.html', stats=stats)
 
 @app.route('/upload')
 def upload_page():
     """Upload page for sales data"""
-    if not sku_mapper_available:
+    if not get_sku_mapper():
         flash('SKU Mapper is not available. Please check the installation.')
         return redirect(url_for('dashboard'))
     return render_template('upload.html')
@@ -94,7 +139,8 @@ def upload_page():
 @app.route('/upload', methods=['POST'])
 def upload_file():
     """Handle file upload and processing with AI sync"""
-    if not sku_mapper_available or not sku_mapper:
+    sku_mapper = get_sku_mapper()
+    if not sku_mapper:
         flash('SKU Mapper is not available.')
         return redirect(url_for('dashboard'))
     
@@ -108,22 +154,31 @@ def upload_file():
         return redirect(request.url)
     
     if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"{timestamp}_{filename}"
+        extension = file.filename.rsplit('.', 1)[1].lower()
+        filename = f"{hash_upload(file.stream)}.{extension}"
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        processed_filename, processed_filepath = processed_file_paths(filename, sku_mapper)
+        already_processed = processed_file_exists(processed_filename, processed_filepath)
+        if not already_processed and not os.path.exists(filepath):
+            with open(filepath, 'wb') as saved_file:
+                shutil.copyfileobj(file.stream, saved_file, UPLOAD_CHUNK_SIZE)
+            file.stream.seek(0)
         
         try:
-            if filename.lower().endswith('.csv'):
-                df = pd.read_csv(filepath)
+            if already_processed:
+                wait_for_processed_file(processed_filename)
+                processed_df = sku_mapper.restore_processed_data(load_processed_frame(processed_filepath))
             else:
-                df = pd.read_excel(filepath)
-            
-            processed_df = sku_mapper.process_sales_data(df)
+                if filename.endswith('.csv'):
+                    df = pd.read_csv(file.stream, engine='c')
+                else:
+                    df = read_excel(file.stream)
+                
+                processed_df = sku_mapper.process_sales_data(df)
             
             ai_synced = False
-            if ai_enabled and sql_processor and hasattr(sql_processor, 'sync_with_uploaded_data'):
+            sql_processor = get_ai_processors()[1]
+            if sql_processor and hasattr(sql_processor, 'sync_with_uploaded_data'):
                 try:
                     ai_synced = sql_processor.sync_with_uploaded_data(sku_mapper)
                     if ai_synced:
@@ -133,9 +188,10 @@ def upload_file():
                 except Exception as e:
                     flash(f' AI sync error: {str(e)}')
             
-            processed_filename = f"processed_{filename}"
-            processed_filepath = os.path.join(app.config['UPLOAD_FOLDER'], processed_filename)
-            processed_df.to_csv(processed_filepath, index=False)
+            table_html = processed_df.head(100).to_html(classes='table table-striped', table_id='results-table')
+            
+            if not processed_file_exists(processed_filename, processed_filepath):
+                save_processed_files_async(processed_df, processed_filepath, processed_filename)
             
             results = generate_processing_results(processed_df)
             
@@ -143,7 +199,7 @@ def upload_file():
                                  results=results, 
                                  filename=processed_filename,
                                  original_filename=file.filename,
-                                 table_html=processed_df.head(100).to_html(classes='table table-striped', table_id='results-table'),
+                                 table_html=table_html,
                                  ai_synced=ai_synced)
         
         except Exception as e:
@@ -156,7 +212,8 @@ def upload_file():
 @app.route('/mappings')
 def view_mappings():
     """View current SKU mappings"""
-    if not sku_mapper_available or not sku_mapper:
+    sku_mapper = get_sku_mapper()
+    if not sku_mapper:
         flash('SKU Mapper is not available.')
         return redirect(url_for('dashboard'))
     
@@ -165,7 +222,8 @@ def view_mappings():
 @app.route('/mappings/add', methods=['POST'])
 def add_mapping_web():
     """Add new mapping via web interface"""
-    if not sku_mapper_available or not sku_mapper:
+    sku_mapper = get_sku_mapper()
+    if not sku_mapper:
         flash('SKU Mapper is not available.')
         return redirect(url_for('view_mappings'))
     
@@ -190,7 +248,8 @@ def add_mapping_web():
 @app.route('/add-sample-mappings')
 def add_sample_mappings():
     """Add sample mappings for the uploaded data"""
-    if not sku_mapper_available or not sku_mapper:
+    sku_mapper = get_sku_mapper()
+    if not sku_mapper:
         flash('SKU Mapper is not available.')
         return redirect(url_for('dashboard'))
     
@@ -216,7 +275,8 @@ def add_sample_mappings():
 @app.route('/clear-mappings')
 def clear_mappings():
     """Clear all mappings and reset to defaults"""
-    if not sku_mapper_available or not sku_mapper:
+    sku_mapper = get_sku_mapper()
+    if not sku_mapper:
         flash('SKU Mapper is not available.')
         return redirect(url_for('dashboard'))
     
@@ -227,7 +287,7 @@ def clear_mappings():
 @app.route('/ai-chat')
 def ai_chat():
     """AI chat interface"""
-    if not ai_enabled:
+    if not get_ai_processors()[0]:
         flash('AI features are not available. Please set GROQ_API_KEY environment variable.')
         return redirect(url_for('dashboard'))
     
@@ -236,7 +296,8 @@ def ai_chat():
 @app.route('/mapping-summary')
 def mapping_summary():
     """Show intelligent mapping summary"""
-    if not sku_mapper_available or not sku_mapper:
+    sku_mapper = get_sku_mapper()
+    if not sku_mapper:
         flash('SKU Mapper is not available.')
         return redirect(url_for('dashboard'))
     
@@ -250,10 +311,12 @@ def mapping_summary():
 @app.route('/sync-ai-data')
 def sync_ai_data():
     """Manually sync uploaded data with AI system"""
-    if not ai_enabled:
+    sql_processor = get_ai_processors()[1]
+    if not sql_processor:
         flash('AI features are not available.')
         return redirect(url_for('dashboard'))
     
+    sku_mapper = get_sku_mapper()
     if not sku_mapper or not hasattr(sku_mapper, 'processed_data') or sku_mapper.processed_data is None:
         flash('No processed data found. Please upload a file first.')
         return redirect(url_for('upload_page'))
@@ -275,7 +338,8 @@ def sync_ai_data():
 @app.route('/api/ai-query', methods=['POST'])
 def api_ai_query():
     """Process AI query"""
-    if not ai_enabled:
+    ai_processor = get_ai_processors()[0]
+    if not ai_processor:
         return jsonify({
             'success': False,
             'error': 'AI features are not enabled'
@@ -301,10 +365,70 @@ def api_ai_query():
             'error': str(e)
         }), 500
 
+@app.route('/api/ai-query-batch', methods=['POST'])
+def api_ai_query_batch():
+    """Process several AI queries, classifying their intents in one batch"""
+    ai_processor = get_ai_processors()[0]
+    if not ai_processor:
+        return jsonify({
+            'success': False,
+            'error': 'AI features are not enabled'
+        }), 400
+    
+    try:
+        data = request.get_json()
+        queries = [str(query).strip() for query in data.get('queries', [])]
+        
+        if not queries or not all(queries):
+            return jsonify({
+                'success': False,
+                'error': 'Queries cannot be empty'
+            }), 400
+        
+        results = ai_processor.process_user_queries(queries)
+        
+        return jsonify({'success': True, 'results': results})
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/ai-query-stream', methods=['POST'])
+def api_ai_query_stream():
+    """Stream a natural language data query as NDJSON: a header line, then one line per batch of row records"""
+    sql_processor = get_ai_processors()[1]
+    if not sql_processor:
+        return jsonify({
+            'success': False,
+            'error': 'AI features are not enabled'
+        }), 400
+    
+    try:
+        data = request.get_json()
+        query = data.get('query', '').strip()
+        
+        if not query:
+            return jsonify({
+                'success': False,
+                'error': 'Query cannot be empty'
+            }), 400
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+    
+    lines = (app.json.dumps(item) + '\n' for item in sql_processor.process_natural_query_stream(query))
+    return app.response_class(lines, mimetype='application/x-ndjson')
+
 @app.route('/api/sql-query', methods=['POST'])
 def api_sql_query():
     """Execute SQL query directly"""
-    if not ai_enabled:
+    sql_processor = get_ai_processors()[1]
+    if not sql_processor:
         return jsonify({
             'success': False,
             'error': 'AI features are not enabled'
@@ -329,13 +453,7 @@ def api_sql_query():
                 'sql_query': sql_query
             }), 400
         
-        return jsonify({
-            'success': True,
-            'data': df.to_dict('records'),
-            'columns': list(df.columns),
-            'row_count': len(df),
-            'sql_query': sql_query
-        })
+        return records_response(df, success=True, columns=list(df.columns), row_count=len(df), sql_query=sql_query)
     
     except Exception as e:
         return jsonify({
@@ -346,7 +464,8 @@ def api_sql_query():
 @app.route('/api/process-data', methods=['POST'])
 def api_process_data():
     """API endpoint for processing data"""
-    if not sku_mapper_available or not sku_mapper:
+    sku_mapper = get_sku_mapper()
+    if not sku_mapper:
         return jsonify({
             'success': False,
             'error': 'SKU Mapper is not available'
@@ -359,13 +478,9 @@ def api_process_data():
 
         processed_df = sku_mapper.process_sales_data(df)
 
-        result = {
-            'success': True,
-            'data': processed_df.to_dict('records'),
-            'summary': generate_processing_results(processed_df)
-        }
+        summary = generate_processing_results(processed_df)
         
-        return jsonify(result)
+        return records_response(processed_df, success=True, summary=summary)
     
     except Exception as e:
         return jsonify({
@@ -376,7 +491,8 @@ def api_process_data():
 @app.route('/api/mappings', methods=['GET'])
 def get_mappings():
     """Get current SKU mappings"""
-    if not sku_mapper_available or not sku_mapper:
+    sku_mapper = get_sku_mapper()
+    if not sku_mapper:
         return jsonify({'error': 'SKU Mapper not available'}), 400
     
     return jsonify(sku_mapper.master_mappings)
@@ -384,7 +500,8 @@ def get_mappings():
 @app.route('/api/mappings', methods=['POST'])
 def add_mapping():
     """Add new SKU mapping"""
-    if not sku_mapper_available or not sku_mapper:
+    sku_mapper = get_sku_mapper()
+    if not sku_mapper:
         return jsonify({'success': False, 'error': 'SKU Mapper not available'}), 400
     
     try:
@@ -406,12 +523,13 @@ def add_mapping():
 def view_results(filename):
     """View processing results"""
     try:
+        wait_for_processed_file(filename)
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        df = pd.read_csv(filepath)
+        preview_df, stats_df = load_results(filepath)
         
-        table_html = df.head(100).to_html(classes='table table-striped', table_id='results-table')
+        table_html = preview_df.to_html(classes='table table-striped', table_id='results-table')
         
-        results = generate_processing_results(df)
+        results = generate_processing_results(stats_df)
         
         return render_template('results.html', 
                              table_html=table_html,
@@ -426,8 +544,21 @@ def view_results(filename):
 def download_file(filename):
     """Download processed file"""
     try:
-        from flask import send_from_directory
-        return send_from_directory(app.config['UPLOAD_FOLDER'], filename, as_attachment=True)
+        wait_for_processed_file(filename)
+        upload_folder = os.path.abspath(app.config['UPLOAD_FOLDER'])
+        compressed_path = safe_join(upload_folder, f"{filename}.zst")
+        if compressed_path and os.path.exists(compressed_path):
+            if 'zstd' in request.accept_encodings:
+                response = send_from_directory(upload_folder, f"{filename}.zst", as_attachment=True, download_name=filename,
+                                               mimetype='text/csv', conditional=True, etag=True, max_age=3600)
+                response.headers['Content-Encoding'] = 'zstd'
+            else:
+                response = send_file(open_stored_input(safe_join(upload_folder, filename)), mimetype='text/csv',
+                                     as_attachment=True, download_name=filename, max_age=3600)
+            response.vary.add('Accept-Encoding')
+            return response
+        return send_from_directory(upload_folder, filename, as_attachment=True,
+                                   conditional=True, etag=True, max_age=3600)
     except Exception as e:
         flash(f'Error downloading file: {str(e)}')
         return redirect(url_for('dashboard'))
@@ -437,33 +568,157 @@ def allowed_file(filename):
     ALLOWED_EXTENSIONS = {'csv', 'xlsx', 'xls'}
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def records_response(df, **fields):
+    """JSON response of fields plus df as 'data' records, with the rows serialized by pandas in one pass"""
+    data_json = df.to_json(orient='records', date_format='iso')
+    fields_json = app.json.dumps(fields)[:-1]
+    separator = ', ' if fields else ''
+    return app.response_class(f'{fields_json}{separator}"data": {data_json}}}', mimetype='application/json')
+
+def hash_upload(stream):
+    """Return a blake2b hex digest of an upload stream, rewinding it afterwards"""
+    digest = hashlib.blake2b(digest_size=16)
+    for block in iter(lambda: stream.read(UPLOAD_CHUNK_SIZE), b''):
+        digest.update(block)
+    stream.seek(0)
+    return digest.hexdigest()
+
+def processed_file_paths(filename, sku_mapper):
+    """Processed output (name, path) for an upload, keyed on the mappings before it is processed"""
+    stem, extension = filename.rsplit('.', 1)
+    processed_filename = f"processed_{stem}_{sku_mapper.mapping_digest()}.{extension}"
+    return processed_filename, os.path.join(app.config['UPLOAD_FOLDER'], processed_filename)
+
+def read_excel(stream):
+    """Read an Excel upload with calamine when available, else pandas' read-only openpyxl/xlrd readers"""
+    if calamine_available:
+        return pd.read_excel(stream, engine='calamine')
+    return pd.read_excel(stream)
+
+def stored_output_path(filepath):
+    """Where the stored copy of filepath is written, with .zst appended when compressing"""
+    return f"{filepath}.zst" if zstd_available else filepath
+
+def open_stored_output(path):
+    """Open a binary writer for path, zstd-compressing the stream when the codec is available"""
+    if zstd_available:
+        return pa.output_stream(path, compression='zstd')
+    return open(path, 'wb')
+
+@contextmanager
+def atomic_output(path):
+    """Yield a temp path beside path and move it into place only once it has been fully written"""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def open_stored_input(filepath):
+    """Open a file stored by write_csv, decompressing the .zst variant if present"""
+    if zstd_available and os.path.exists(f"{filepath}.zst"):
+        return pa.input_stream(f"{filepath}.zst", compression='zstd')
+    return open(filepath, 'rb')
+
+def write_csv(df, filepath):
+    """Write a DataFrame to CSV in DataFrame.to_csv's format, compressed when zstd is available"""
+    with atomic_output(stored_output_path(filepath)) as tmp_path:
+        with open_stored_output(tmp_path) as sink:
+            df.to_csv(sink, index=False)
+
+def write_results_cache(df, filepath):
+    """Save an uncompressed Feather copy next to the CSV so result views can memory-map it"""
+    if not pyarrow_available:
+        return
+    try:
+        with atomic_output(f"{filepath}.feather") as tmp_path:
+            df.reset_index(drop=True).to_feather(tmp_path, compression='uncompressed')
+    except (pa.ArrowException, TypeError, ValueError):
+        pass
+
+def save_processed_files(df, filepath):
+    """Write the processed CSV and its Feather cache"""
+    write_csv(df, filepath)
+    write_results_cache(df, filepath)
+
+def save_processed_files_async(df, filepath, filename):
+    """Queue the processed file writes so the upload response isn't held up by disk I/O"""
+    future = file_writer.submit(save_processed_files, df, filepath)
+    pending_writes[filename] = future
+    future.add_done_callback(lambda done: finish_processed_write(filename, done))
+
+def finish_processed_write(filename, future):
+    """Drop a finished write from pending_writes, logging it if it failed"""
+    error = None if future.cancelled() else future.exception()
+    if error is not None:
+        app.logger.error(f"Failed to write processed file {filename}", exc_info=error)
+    if pending_writes.get(filename) is future:
+        pending_writes.pop(filename, None)
+
+def wait_for_processed_file(filename):
+    """Block until any queued write for this processed file has finished"""
+    future = pending_writes.get(filename)
+    if future is not None:
+        future.result()
+
+def processed_file_exists(filename, filepath):
+    """Check whether a processed file is stored or still being written"""
+    return filename in pending_writes or any(
+        os.path.exists(path) for path in (filepath, f"{filepath}.zst", f"{filepath}.feather")
+    )
+
+def load_processed_frame(filepath):
+    """Load a previously processed file in full"""
+    if pyarrow_available and os.path.exists(f"{filepath}.feather"):
+        return pd.read_feather(f"{filepath}.feather")
+    with open_stored_input(filepath) as source:
+        return pd.read_csv(source)
+
+def load_results(filepath):
+    """Load a processed file as (first 100 rows, frame for summary stats)"""
+    feather_path = f"{filepath}.feather"
+    if pyarrow_available and os.path.exists(feather_path):
+        table = pafeather.read_table(feather_path, memory_map=True)
+        preview_df = table.slice(0, 100).to_pandas()
+        if 'MSKU' in table.column_names:
+            stats_df = table.select(['MSKU']).to_pandas()
+        else:
+            stats_df = pd.DataFrame(index=pd.RangeIndex(table.num_rows))
+        return preview_df, stats_df
+    
+    with open_stored_input(filepath) as source:
+        df = pd.read_csv(source)
+    return df.head(100), df
+
 def generate_processing_results(df):
     """Generate processing results summary with intelligent mapping info"""
     total_records = len(df)
     
     if 'MSKU' in df.columns:
-        df['MSKU'] = df['MSKU'].fillna('UNCATEGORIZED_UNKNOWN').astype(str)
-        mapped_records = len(df[~df['MSKU'].str.startswith('UNCATEGORIZED_', na=False)])
+        msku = df['MSKU'].astype('string').fillna('UNCATEGORIZED_UNKNOWN')
+        
+        category_counts = msku.value_counts()
+        is_uncategorized = category_counts.index.str.startswith('UNCATEGORIZED_')
+        
+        mapped_records = int(category_counts[~is_uncategorized].sum())
         unmapped_records = total_records - mapped_records
         
-        top_products = df['MSKU'].value_counts().head(10).to_dict()
+        top_products = category_counts.head(10).to_dict()
         
-        category_insights = {}
-        for category, count in df['MSKU'].value_counts().items():
-            if not category.startswith('UNCATEGORIZED_'):
-                category_type = 'Auto-Generated'
-                if 'BRAND' in category:
-                    category_type = 'Brand-Based'
-                elif 'NUMERIC' in category:
-                    category_type = 'Pattern-Based'
-                elif 'CATEGORY' in category:
-                    category_type = 'Product-Based'
-                
-                category_insights[category] = {
-                    'count': count,
-                    'type': category_type,
-                    'percentage': round((count / total_records) * 100, 1)
-                }
+        mapped_counts = category_counts[~is_uncategorized]
+        type_keywords = mapped_counts.index.str.extract(_CATEGORY_TYPE_RE).fillna('').sum(axis=1)
+        category_types = type_keywords.map(_CATEGORY_TYPE_LABELS).fillna('Auto-Generated')
+        
+        category_insights = {
+            category: {
+                'count': count,
+                'type': category_type,
+                'percentage': round((count / total_records) * 100, 1)
+            }
+            for category, count, category_type in zip(mapped_counts.index, mapped_counts.tolist(), category_types.tolist())
+        }
     else:
         mapped_records = 0
         unmapped_records = total_records
@@ -500,17 +755,18 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'features': {
-            'sku_mapper': sku_mapper_available,
-            'ai_features': ai_enabled,
-            'baserow': baserow_available
+            'sku_mapper': get_sku_mapper() is not None,
+            'ai_features': get_ai_processors()[0] is not None,
+            'baserow': baserow_available()
         },
         'timestamp': datetime.now().isoformat()
     })
 
 if __name__ == '__main__':
     print("Starting Warehouse Management System...")
-    print(f"SKU Mapper Available: {sku_mapper_available}")
-    print(f" Baserow Available: {baserow_available}")
+    ai_enabled = get_ai_processors()[0] is not None
+    print(f"SKU Mapper Available: {get_sku_mapper() is not None}")
+    print(f" Baserow Available: {baserow_available()}")
     print(f" AI Features Available: {ai_enabled}")
     
     if not ai_enabled:
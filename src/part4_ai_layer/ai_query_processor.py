@@ -1,32 +1,98 @@
-from groq import Groq
+from collections import OrderedDict
+from functools import lru_cache
 from typing import Dict, Any, List
 import json
 import os
+import re
+import threading
 import pandas as pd
 
+# Only unambiguous signals are matched locally: "bar"/"line" need a chart noun and "calculate" needs a column or field
+_LOCAL_INTENT_PATTERNS = (
+    ('chart_request', re.compile(r'\b(charts?|graphs?|plots?|histograms?|heatmaps?|visuali[sz](?:e|ation))\b', re.I)),
+    ('data_query', re.compile(r'\b(show|list|select|top|filter|where|find|get|how many|count|sum|avg)\b', re.I)),
+    ('calculation', re.compile(r'\b(?:add|create|calculate|compute|derive)\b.*\b(?:column|field)s?\b', re.I)),
+)
+
+_VALID_INTENTS = ('data_query', 'chart_request', 'calculation', 'other')
+_INTENT_DESCRIPTIONS = """data_query - User wants to retrieve, filter, or view data from the database
+chart_request - User wants to create a visualization, graph, or chart
+calculation - User wants to add calculated fields or perform mathematical operations
+other - Everything else"""
+
+def _match_local_intent(query: str) -> str:
+    """Return the intent when exactly one local pattern matches, otherwise None"""
+    matches = [intent for intent, pattern in _LOCAL_INTENT_PATTERNS if pattern.search(query)]
+    return matches[0] if len(matches) == 1 else None
+
+_CHART_TYPES = ('bar', 'line', 'pie', 'scatter', 'histogram', 'box')
+_CHART_KEYWORD_RE = re.compile(
+    r'^(?:.*(bar|column)|.*(line|trend|over time)|.*(pie|distribution|percentage)'
+    r'|.*(scatter|correlation|relationship)|.*(histogram|frequency)|.*(box|quartile|outlier))',
+    re.I | re.S
+)
+
+@lru_cache(maxsize=512)
+def _match_chart_type(query: str) -> str:
+    """Return the first chart type, in _CHART_TYPES order, whose keywords appear in the query"""
+    match = _CHART_KEYWORD_RE.match(query)
+    return _CHART_TYPES[match.lastindex - 1] if match else None
+
+INTENT_CACHE_SIZE = 1024
+_intent_cache = OrderedDict()
+_intent_cache_lock = threading.Lock()
+
+def _cached_intent(model: str, query: str) -> str:
+    """Return the remembered Groq intent for a query under a model, or None"""
+    with _intent_cache_lock:
+        intent = _intent_cache.get((model, query))
+        if intent is not None:
+            _intent_cache.move_to_end((model, query))
+        return intent
+
+def _remember_intent(model: str, query: str, intent: str):
+    """Remember a Groq intent, evicting the least recently used beyond INTENT_CACHE_SIZE"""
+    with _intent_cache_lock:
+        _intent_cache[(model, query)] = intent
+        _intent_cache.move_to_end((model, query))
+        if len(_intent_cache) > INTENT_CACHE_SIZE:
+            _intent_cache.popitem(last=False)
+
 class AIQueryProcessor:
     def __init__(self, api_key: str = None):
         api_key = api_key or os.getenv('GROQ_API_KEY')
         if not api_key:
             raise ValueError("Groq API key is required. Set GROQ_API_KEY environment variable.")
         
-        self.client = Groq(api_key=api_key)
-        self.model = "llama3-8b-8192"
-        
-        from .text_to_sql import SQLQueryProcessor
+        from .text_to_sql import SQLQueryProcessor, get_groq_client
         from .chart_generator import ChartGenerator
         
-        self.sql_processor = SQLQueryProcessor(api_key)
+        self.client = get_groq_client(api_key)
+        self.model = "llama3-8b-8192"
+        
+        self.sql_processor = SQLQueryProcessor(api_key, client=self.client)
         self.chart_generator = ChartGenerator()
     
     def process_user_query(self, query: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
         """Process user query and determine appropriate action"""
-        intent = self._classify_intent(query)
-        
+        return self._dispatch_query(query, self._classify_intent(query), context)
+    
+    def process_user_queries(self, queries: List[str], context: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """Process several user queries, classifying their intents in a single batch"""
+        intents = self._classify_intents(queries)
+        sql_indices = [i for i, intent in enumerate(intents) if intent in ('data_query', 'chart_request')]
+        sql_results = dict(zip(sql_indices, self.sql_processor.process_natural_queries([queries[i] for i in sql_indices])))
+        return [
+            self._dispatch_query(query, intent, context, sql_results.get(i))
+            for i, (query, intent) in enumerate(zip(queries, intents))
+        ]
+    
+    def _dispatch_query(self, query: str, intent: str, context: Dict[str, Any], sql_result: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Route a query to the handler for its intent, reusing its SQL result if already run"""
         if intent == 'data_query':
-            return self._handle_data_query(query, context)
+            return self._handle_data_query(query, context, sql_result)
         elif intent == 'chart_request':
-            return self._handle_chart_request(query, context)
+            return self._handle_chart_request(query, context, sql_result)
         elif intent == 'calculation':
             return self._handle_calculation_request(query, context)
         else:
@@ -38,39 +104,88 @@ class AIQueryProcessor:
             }
     
     def _classify_intent(self, query: str) -> str:
-        """Classify user intent using Groq AI"""
-        system_prompt = """Classify the user's intent into exactly one of these categories:
+        """Classify user intent locally, falling back to Groq AI for ambiguous queries"""
+        intent = _match_local_intent(query)
+        if intent:
+            return intent
+        
+        try:
+            return self._classify_intent_remote(query)
+        except Exception as e:
+            print(f"Error classifying intent: {e}")
+            return 'other'
+    
+    def _classify_intents(self, queries: List[str]) -> List[str]:
+        """Classify queries locally where possible, sending the rest to Groq AI in one request"""
+        intents = [_match_local_intent(query) for query in queries]
+        pending = [i for i, intent in enumerate(intents) if not intent]
+        if len(pending) == 1:
+            intents[pending[0]] = self._classify_intent(queries[pending[0]])
+        elif pending:
+            remote_intents = self._classify_intents_remote([queries[i] for i in pending])
+            for i, intent in zip(pending, remote_intents):
+                intents[i] = intent
+        return intents
+    
+    def _classify_intents_remote(self, queries: List[str]) -> List[str]:
+        """Classify a batch of queries with one Groq AI call, falling back to one call per query"""
+        system_prompt = f"""Classify the intent of each numbered user query into exactly one of these categories:
 
-data_query - User wants to retrieve, filter, or view data from the database
-chart_request - User wants to create a visualization, graph, or chart
-calculation - User wants to add calculated fields or perform mathematical operations
-other - Everything else
+{_INTENT_DESCRIPTIONS}
 
-Return ONLY the category name, nothing else."""
+Return a JSON object of the form {{"intents": [...]}} with one category name per query, in order."""
         
         try:
             response = self.client.chat.completions.create(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": query}
+                    {"role": "user", "content": "\n".join(f"{i}. {query}" for i, query in enumerate(queries, 1))}
                 ],
                 temperature=0.1,
-                max_tokens=20
+                max_tokens=20 * len(queries) + 20,
+                response_format={"type": "json_object"}
             )
             
-            intent = response.choices[0].message.content.strip().lower()
-            
-            valid_intents = ['data_query', 'chart_request', 'calculation', 'other']
-            return intent if intent in valid_intents else 'other'
-            
+            intents = json.loads(response.choices[0].message.content)['intents']
+            if isinstance(intents, list) and len(intents) == len(queries):
+                intents = [str(intent).strip().lower() for intent in intents]
+                return [intent if intent in _VALID_INTENTS else 'other' for intent in intents]
         except Exception as e:
-            print(f"Error classifying intent: {e}")
-            return 'other'
+            print(f"Error classifying intents in batch: {e}")
+        
+        return [self._classify_intent(query) for query in queries]
     
-    def _handle_data_query(self, query: str, context: Dict[str, Any]) -> Dict[str, Any]:
+    def _classify_intent_remote(self, query: str) -> str:
+        """Classify user intent using Groq AI, remembering answers to repeated questions across processors"""
+        intent = _cached_intent(self.model, query)
+        if intent is not None:
+            return intent
+        
+        system_prompt = f"""Classify the user's intent into exactly one of these categories:
+
+{_INTENT_DESCRIPTIONS}
+
+Return ONLY the category name, nothing else."""
+        
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": query}
+            ],
+            temperature=0.1,
+            max_tokens=20
+        )
+        
+        intent = response.choices[0].message.content.strip().lower()
+        intent = intent if intent in _VALID_INTENTS else 'other'
+        _remember_intent(self.model, query, intent)
+        return intent
+    
+    def _handle_data_query(self, query: str, context: Dict[str, Any], result: Dict[str, Any] = None) -> Dict[str, Any]:
         """Handle data retrieval queries"""
-        result = self.sql_processor.process_natural_query(query)
+        result = result or self.sql_processor.process_natural_query(query)
         
         if result['success'] and result['data']:
             df = pd.DataFrame(result['data'])
@@ -80,9 +195,9 @@ Return ONLY the category name, nothing else."""
         
         return result
     
-    def _handle_chart_request(self, query: str, context: Dict[str, Any]) -> Dict[str, Any]:
+    def _handle_chart_request(self, query: str, context: Dict[str, Any], data_result: Dict[str, Any] = None) -> Dict[str, Any]:
         """Handle chart creation requests"""
-        data_result = self.sql_processor.process_natural_query(query)
+        data_result = data_result or self.sql_processor.process_natural_query(query)
         
         if not data_result['success']:
             return data_result
@@ -145,19 +260,4 @@ Return ONLY the category name, nothing else."""
     
     def _extract_chart_type(self, query: str) -> str:
         """Extract chart type from natural language query"""
-        query_lower = query.lower()
-        
-        chart_keywords = {
-            'bar': ['bar', 'column'],
-            'line': ['line', 'trend', 'over time'],
-            'pie': ['pie', 'distribution', 'percentage'],
-            'scatter': ['scatter', 'correlation', 'relationship'],
-            'histogram': ['histogram', 'frequency'],
-            'box': ['box', 'quartile', 'outlier']
-        }
-        
-        for chart_type, keywords in chart_keywords.items():
-            if any(keyword in query_lower for keyword in keywords):
-                return chart_type
-        
-        return None
\ No newline at end of file
+        return _match_chart_type(query)
@@ -1,57 +1,140 @@
 import plotly.graph_objects as go
-import plotly.express as px
+import plotly.colors as pc
+import plotly.io as pio
 import pandas as pd
+import base64
 import json
+import re
 import numpy as np
+from functools import lru_cache
 from typing import Dict, Any, List, Tuple, Optional
 
+try:
+    import orjson
+    orjson_available = True
+except ImportError:
+    orjson_available = False
+
+ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson_available else 0
+
+def _orjson_default(obj):
+    """Serialize the values orjson has no native support for, such as object arrays"""
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+    return str(obj)
+
+PLOT_TEMPLATE = pio.templates['plotly_white']
+PLOT_TEMPLATE_JSON = PLOT_TEMPLATE.to_plotly_json()
+VIRIDIS_SCALE = pc.make_colorscale(pc.sequential.Viridis)
+RDBU_SCALE = pc.make_colorscale(pc.diverging.RdBu)
+GRID_AXIS = dict(showgrid=True, gridwidth=1, gridcolor='LightGray')
+
+ColumnGroups = Tuple[List[str], List[str], List[str]]
+
+CHART_KEYWORDS = {
+    'bar': ['bar', 'column', 'vertical'],
+    'line': ['line', 'trend', 'time', 'over time', 'timeline'],
+    'pie': ['pie', 'distribution', 'percentage', 'proportion'],
+    'scatter': ['scatter', 'correlation', 'relationship', 'vs'],
+    'histogram': ['histogram', 'frequency', 'distribution'],
+    'box': ['box', 'quartile', 'outlier', 'spread'],
+    'heatmap': ['heatmap', 'correlation matrix', 'heat'],
+    'area': ['area', 'stacked area', 'filled'],
+    'donut': ['donut', 'doughnut']
+}
+
+CHART_REQUIREMENTS = {
+    'pie': (1, 1, "Pie charts need at least one categorical and one numeric column"),
+    'scatter': (0, 2, "Scatter plots need at least two numeric columns"),
+    'heatmap': (0, 2, "Heatmaps need at least two numeric columns"),
+    'histogram': (0, 1, "Histograms need at least one numeric column"),
+    'box': (0, 1, "Box plots need at least one numeric column")
+}
+
+CHART_INTENT_RE = re.compile(
+    '^(?:' + '|'.join(
+        f"(?:.*(?P<{chart_type}>{'|'.join(map(re.escape, keywords))}))"
+        for chart_type, keywords in CHART_KEYWORDS.items()
+    ) + ')',
+    re.S
+)
+
+@lru_cache(maxsize=256)
+def _match_chart_intent(user_intent: str) -> Optional[str]:
+    """Return the first chart type, in CHART_KEYWORDS order, with a keyword in the intent"""
+    match = CHART_INTENT_RE.match(user_intent.lower())
+    return match.lastgroup if match else None
+
+def _typed_array(values: np.ndarray):
+    """Encode a numeric array as a plotly.js typed-array spec, leaving other arrays untouched"""
+    if values.dtype.kind not in 'iuf':
+        return values
+    if values.dtype.kind in 'iu' and values.dtype.itemsize == 8:
+        narrow = values.astype(np.int32)
+        values = narrow if np.array_equal(narrow, values) else values.astype(np.float64)
+    elif values.dtype.kind == 'f' and values.dtype.itemsize < 4:
+        values = values.astype(np.float32)
+    values = np.ascontiguousarray(values, dtype=values.dtype.newbyteorder('<'))
+    spec = {'dtype': values.dtype.str[1:], 'bdata': base64.b64encode(values.tobytes()).decode('ascii')}
+    if values.ndim > 1:
+        spec['shape'] = ', '.join(map(str, values.shape))
+    return spec
+
+def _hovertemplate(**axes) -> str:
+    """Build the column=value hover text plotly express would generate"""
+    labels = {name: axis for axis, name in axes.items()}
+    return '<br>'.join(f'{name}=%{{{axis}}}' for name, axis in labels.items()) + '<extra></extra>'
+
+def _top_indices(values: np.ndarray, n: int) -> np.ndarray:
+    """Positions of the n largest values in descending order, breaking ties by position like nlargest"""
+    cutoff = np.partition(values, values.size - n)[values.size - n]
+    larger = np.flatnonzero(values > cutoff)
+    top = np.concatenate([larger, np.flatnonzero(values == cutoff)[:n - larger.size]])
+    return top[np.lexsort((-top, values[top]))[::-1]]
+
+def _aggregatable(values: pd.Series) -> pd.Series:
+    """Undo a categorical encoding so a value column can be summed"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.astype(values.cat.categories.dtype)
+    return values
+
+def _count_unique(values: pd.Series) -> int:
+    """Number of distinct non-null values, counted from the codes when the column is categorical"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy()
+        return int(np.count_nonzero(np.bincount(codes[codes >= 0], minlength=1)))
+    return values.nunique()
+
 class ChartGenerator:
-    def __init__(self):
-        self.chart_types = {
-            'bar': self._create_bar_chart,
-            'line': self._create_line_chart,
-            'pie': self._create_pie_chart,
-            'scatter': self._create_scatter_chart,
-            'histogram': self._create_histogram,
-            'box': self._create_box_plot,
-            'heatmap': self._create_heatmap,
-            'area': self._create_area_chart,
-            'donut': self._create_donut_chart
-        }
-        
-        self.color_palettes = {
-            'default': px.colors.qualitative.Set3,
-            'blues': px.colors.sequential.Blues,
-            'greens': px.colors.sequential.Greens,
-            'reds': px.colors.sequential.Reds
-        }
+    COLOR_PALETTES = {
+        'default': pc.qualitative.Set3,
+        'blues': pc.sequential.Blues,
+        'greens': pc.sequential.Greens,
+        'reds': pc.sequential.Reds
+    }
     
-    def suggest_chart_type(self, df: pd.DataFrame, user_intent: str = "") -> str:
+    def _classify_columns(self, df: pd.DataFrame) -> ColumnGroups:
+        """Split columns into numeric, categorical and datetime lists in one pass over the dtypes"""
+        numeric_cols, categorical_cols, date_cols = [], [], []
+        for name, dtype in df.dtypes.items():
+            if dtype == object or isinstance(dtype, (pd.CategoricalDtype, pd.StringDtype)):
+                categorical_cols.append(name)
+            elif dtype.kind in 'iufc':
+                numeric_cols.append(name)
+            elif dtype.kind == 'M':
+                date_cols.append(name)
+        return numeric_cols, categorical_cols, date_cols
+    
+    def suggest_chart_type(self, df: pd.DataFrame, user_intent: str = "", columns: ColumnGroups = None) -> str:
         """Enhanced chart type suggestion based on data characteristics and user intent"""
         if df.empty:
             return 'bar'
-            
-        numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
-        categorical_cols = df.select_dtypes(include=['object', 'category', 'string']).columns.tolist()
-        date_cols = df.select_dtypes(include=['datetime64']).columns.tolist()
-        
-        intent_lower = user_intent.lower()
-        
-        chart_keywords = {
-            'bar': ['bar', 'column', 'vertical'],
-            'line': ['line', 'trend', 'time', 'over time', 'timeline'],
-            'pie': ['pie', 'distribution', 'percentage', 'proportion'],
-            'scatter': ['scatter', 'correlation', 'relationship', 'vs'],
-            'histogram': ['histogram', 'frequency', 'distribution'],
-            'box': ['box', 'quartile', 'outlier', 'spread'],
-            'heatmap': ['heatmap', 'correlation matrix', 'heat'],
-            'area': ['area', 'stacked area', 'filled'],
-            'donut': ['donut', 'doughnut']
-        }
         
-        for chart_type, keywords in chart_keywords.items():
-            if any(keyword in intent_lower for keyword in keywords):
-                return chart_type
+        chart_type = _match_chart_intent(user_intent)
+        if chart_type:
+            return chart_type
+        
+        numeric_cols, categorical_cols, date_cols = columns or self._classify_columns(df)
         
         num_rows = len(df)
         
@@ -59,7 +142,7 @@ class ChartGenerator:
             return 'line'
         
         if len(categorical_cols) >= 1 and len(numeric_cols) >= 1:
-            unique_categories = df[categorical_cols[0]].nunique()
+            unique_categories = _count_unique(df[categorical_cols[0]])
             
             if unique_categories <= 8 and num_rows <= 50:
                 return 'pie'
@@ -82,27 +165,36 @@ class ChartGenerator:
         if df.empty:
             raise ValueError("Cannot create chart from empty data")
         
-        if chart_type not in self.chart_types:
+        config = config or {}
+        
+        try:
+            columns = self._classify_columns(df)
+            df_processed = self._preprocess_data(df, columns, not config.get('preserve_precision'))
+        except Exception as e:
+            return self._create_fallback_chart(df, str(e))
+        
+        return self._render_chart(df, df_processed, chart_type, config, columns)
+    
+    def _render_chart(self, df: pd.DataFrame, df_processed: pd.DataFrame, chart_type: str, config: Dict[str, Any], columns: ColumnGroups) -> str:
+        """Build, style and serialize a chart from an already preprocessed frame"""
+        if chart_type not in self.CHART_BUILDERS:
             chart_type = 'bar'
         
-        config = config or {}
-
         try:
-            df_processed = self._preprocess_data(df)
-            
-            fig = self.chart_types[chart_type](df_processed, config)
+            fig = self.CHART_BUILDERS[chart_type](self, df_processed, config, columns)
             
-            fig = self._apply_enhanced_styling(fig, chart_type, config)
+            fig_dict = self._apply_enhanced_styling(fig, chart_type, config)
             
-            return self._safe_json_conversion(fig)
+            return self._safe_json_conversion(fig_dict)
             
         except Exception as e:
             return self._create_fallback_chart(df, str(e))
 
-    def _safe_json_conversion(self, fig: go.Figure) -> str:
-        """Safely convert plotly figure to JSON, handling numpy/pandas types"""
+    def _safe_json_conversion(self, fig_dict: Dict[str, Any]) -> str:
+        """Safely convert a plotly figure dict to JSON, handling numpy/pandas types"""
         try:
-            fig_dict = fig.to_dict()
+            if orjson_available:
+                return orjson.dumps(fig_dict, default=_orjson_default, option=ORJSON_OPTIONS).decode()
             
             fig_dict = self._convert_numpy_types(fig_dict)
             
@@ -110,7 +202,7 @@ class ChartGenerator:
             
         except Exception as e:
             try:
-                return fig.to_json()
+                return pio.to_json(fig_dict, validate=False)
             except:
                 return json.dumps({
                     "data": [],
@@ -118,45 +210,78 @@ class ChartGenerator:
                 })
 
     def _convert_numpy_types(self, obj):
-        """Recursively convert numpy/pandas types to native Python types"""
-        if isinstance(obj, dict):
-            return {key: self._convert_numpy_types(value) for key, value in obj.items()}
-        elif isinstance(obj, list):
-            return [self._convert_numpy_types(item) for item in obj]
-        elif isinstance(obj, (np.integer, np.int64, np.int32)):
-            return int(obj)
-        elif isinstance(obj, (np.floating, np.float64, np.float32)):
-            return float(obj)
+        """Convert numpy/pandas types to native Python types, updating dicts and lists in place"""
+        if not isinstance(obj, (dict, list)):
+            return self._convert_numpy_value(obj)
+        stack = [obj]
+        while stack:
+            container = stack.pop()
+            for key, value in (container.items() if isinstance(container, dict) else enumerate(container)):
+                if isinstance(value, (dict, list)):
+                    stack.append(value)
+                else:
+                    converted = self._convert_numpy_value(value)
+                    if converted is not value:
+                        container[key] = converted
+        return obj
+    
+    @staticmethod
+    def _convert_numpy_value(obj):
+        """Convert a single numpy/pandas scalar or array to its native Python equivalent"""
+        if isinstance(obj, (np.integer, np.floating, np.bool_)):
+            return obj.item()
         elif isinstance(obj, np.ndarray):
             return obj.tolist()
-        elif pd.isna(obj):
+        elif obj is pd.NaT or obj is pd.NA or (isinstance(obj, (float, np.datetime64, np.timedelta64)) and obj != obj):
             return None
-        else:
-            return obj
+        return obj
     
-    def _preprocess_data(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _preprocess_data(self, df: pd.DataFrame, columns: ColumnGroups, downcast: bool = True) -> pd.DataFrame:
         """Preprocess data for better chart rendering"""
-        df_clean = df.copy()
-        
-        numeric_cols = df_clean.select_dtypes(include=['number']).columns
-        categorical_cols = df_clean.select_dtypes(include=['object', 'category']).columns
-        
-        df_clean[numeric_cols] = df_clean[numeric_cols].fillna(0)
-        
-        df_clean[categorical_cols] = df_clean[categorical_cols].fillna('Unknown')
-        
-        if len(df_clean) > 1000:
-            df_clean = df_clean.head(1000)
-        
+        numeric_cols, categorical_cols, _ = columns
+        
+        df_clean = df.iloc[:1000]
+        
+        updates = {col: df_clean[col].fillna(0) for col in numeric_cols if df_clean[col].hasnans}
+        
+        if downcast:
+            for col in numeric_cols:
+                values = updates.get(col, df_clean[col])
+                if values.dtype == np.int64:
+                    updates[col] = pd.to_numeric(values, downcast='integer')
+                elif values.dtype == np.float64:
+                    narrow = values.astype(np.float32)
+                    if (narrow == values).all():
+                        updates[col] = narrow
+        
+        for col in categorical_cols:
+            values = df_clean[col]
+            if values.hasnans:
+                if isinstance(values.dtype, pd.CategoricalDtype) and 'Unknown' not in values.cat.categories:
+                    values = values.cat.add_categories('Unknown')
+                values = updates[col] = values.fillna('Unknown')
+            if values.dtype == object:
+                codes, uniques = pd.factorize(values)
+                if len(uniques) < len(values) / 2:
+                    updates[col] = pd.Series(pd.Categorical.from_codes(codes, uniques), index=values.index, name=col)
+        
+        if not updates:
+            return df_clean
+        
+        df_clean = df_clean.copy(deep=False)
+        for col, values in updates.items():
+            df_clean[col] = values
         return df_clean
     
-    def _apply_enhanced_styling(self, fig: go.Figure, chart_type: str, config: Dict[str, Any]) -> go.Figure:
-        """Apply enhanced styling to charts"""
-        fig.update_layout(
-            template="plotly_white",
+    def _apply_enhanced_styling(self, fig: go.Figure, chart_type: str, config: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply enhanced styling to charts, returning the styled figure as a dict"""
+        fig_dict = fig.to_dict()
+        layout = fig_dict['layout']
+        
+        layout.update(
+            template=PLOT_TEMPLATE_JSON,
             font=dict(size=12, family="Arial, sans-serif"),
-            title_font_size=16,
-            title_x=0.5,
+            title=dict(layout.get('title', {}), font=dict(size=16), x=0.5),
             showlegend=True,
             margin=dict(l=60, r=60, t=80, b=60),
             plot_bgcolor='rgba(0,0,0,0)',
@@ -165,190 +290,255 @@ class ChartGenerator:
         )
         
         if chart_type in ['bar', 'line', 'scatter']:
-            fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor='LightGray')
-            fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='LightGray')
+            layout['xaxis'] = dict(layout.get('xaxis', {}), **GRID_AXIS)
+            layout['yaxis'] = dict(layout.get('yaxis', {}), **GRID_AXIS)
         
-        return fig
+        return fig_dict
     
-    def _get_best_columns(self, df: pd.DataFrame) -> Tuple[str, str]:
+    def _get_best_columns(self, df: pd.DataFrame, columns: ColumnGroups) -> Tuple[str, str]:
         """Get the best x and y columns for charting"""
-        numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
-        categorical_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
+        numeric_cols, categorical_cols, _ = columns
         
         x_col = categorical_cols[0] if categorical_cols else df.columns[0]
         y_col = numeric_cols[0] if numeric_cols else df.columns[1] if len(df.columns) > 1 else df.columns[0]
         
         return x_col, y_col
     
-    def _create_bar_chart(self, df: pd.DataFrame, config: Dict[str, Any]) -> go.Figure:
+    def _create_bar_chart(self, df: pd.DataFrame, config: Dict[str, Any], columns: ColumnGroups) -> go.Figure:
         """Enhanced bar chart creation"""
-        x_col, y_col = self._get_best_columns(df)
+        x_col, y_col = self._get_best_columns(df, columns)
         x_col = config.get('x_column', x_col)
         y_col = config.get('y_column', y_col)
         
         if len(df) > 20:
-            df_agg = df.groupby(x_col)[y_col].agg(['sum', 'count']).reset_index()
-            df_agg.columns = [x_col, y_col, 'count']
-            df_agg = df_agg[[x_col, y_col]]
+            totals = _aggregatable(df[y_col]).groupby(df[x_col], sort=False, observed=True).sum()
+            x, y = totals.index.to_numpy(), totals.to_numpy()
         else:
-            df_agg = df
-        
-        if len(df_agg) > 15:
-            df_agg = df_agg.nlargest(15, y_col)
-        
-        fig = px.bar(
-            df_agg, x=x_col, y=y_col,
-            title=config.get('title', f'{y_col} by {x_col}'),
-            color=y_col,
-            color_continuous_scale='viridis',
-            text=y_col
+            x, y = df[x_col].to_numpy(), df[y_col].to_numpy()
+        
+        if y.size > 15:
+            top = _top_indices(y, 15)
+            x, y = x[top], y[top]
+        
+        numeric_y = y.dtype.kind in 'iuf'
+        x, y = _typed_array(x), _typed_array(y)
+        
+        return go.Figure(
+            data=[go.Bar(
+                x=x, y=y,
+                text=y, texttemplate='%{text}', textposition='outside',
+                marker=dict(color=y, coloraxis='coloraxis') if numeric_y else {},
+                hovertemplate=_hovertemplate(**{'x': x_col, 'marker.color': y_col}),
+                showlegend=False,
+                _validate=False
+            )],
+            layout=dict(
+                title=dict(text=config.get('title', f'{y_col} by {x_col}')),
+                xaxis=dict(title=dict(text=str(x_col))),
+                yaxis=dict(title=dict(text=str(y_col))),
+                coloraxis=dict(colorscale=VIRIDIS_SCALE, colorbar=dict(title=dict(text=str(y_col)))),
+                barmode='relative'
+            ),
+            _validate=False
         )
-        
-        fig.update_traces(texttemplate='%{text}', textposition='outside')
-        
-        return fig
     
-    def _create_line_chart(self, df: pd.DataFrame, config: Dict[str, Any]) -> go.Figure:
+    def _create_line_chart(self, df: pd.DataFrame, config: Dict[str, Any], columns: ColumnGroups) -> go.Figure:
         """Enhanced line chart creation"""
-        x_col, y_col = self._get_best_columns(df)
+        x_col, y_col = self._get_best_columns(df, columns)
         x_col = config.get('x_column', x_col)
         y_col = config.get('y_column', y_col)
         
-        fig = px.line(
-            df, x=x_col, y=y_col,
-            title=config.get('title', f'{y_col} over {x_col}'),
-            markers=True,
-            line_shape='spline'
-        )
-        
-        fig.update_traces(
-            line=dict(width=3),
-            marker=dict(size=8)
+        return go.Figure(
+            data=[go.Scatter(
+                x=_typed_array(df[x_col].to_numpy()), y=_typed_array(df[y_col].to_numpy()),
+                mode='lines+markers',
+                line=dict(shape='spline', width=3),
+                marker=dict(size=8),
+                hovertemplate=_hovertemplate(x=x_col, y=y_col),
+                showlegend=False,
+                _validate=False
+            )],
+            layout=dict(
+                title=dict(text=config.get('title', f'{y_col} over {x_col}')),
+                xaxis=dict(title=dict(text=str(x_col))),
+                yaxis=dict(title=dict(text=str(y_col)))
+            ),
+            _validate=False
         )
-        
-        return fig
     
-    def _create_pie_chart(self, df: pd.DataFrame, config: Dict[str, Any]) -> go.Figure:
+    def _create_pie_chart(self, df: pd.DataFrame, config: Dict[str, Any], columns: ColumnGroups, hole: float = 0.0) -> go.Figure:
         """Enhanced pie chart creation"""
-        x_col, y_col = self._get_best_columns(df)
+        x_col, y_col = self._get_best_columns(df, columns)
         names_col = config.get('names_column', x_col)
         values_col = config.get('values_column', y_col)
         
-        df_agg = df.groupby(names_col)[values_col].sum().reset_index()
+        totals = _aggregatable(df[values_col]).groupby(df[names_col], sort=False, observed=True).sum()
+        labels, values = totals.index, totals.to_numpy()
         
-        if len(df_agg) > 10:
-            df_top = df_agg.nlargest(9, values_col)
-            others_sum = df_agg.nsmallest(len(df_agg) - 9, values_col)[values_col].sum()
+        if values.size > 10:
+            top = _top_indices(values, 9)
+            rest = np.ones(values.size, dtype=bool)
+            rest[top] = False
+            others_sum = values[rest].sum()
+            labels, values = labels[top], values[top]
             if others_sum > 0:
-                others_row = pd.DataFrame({names_col: ['Others'], values_col: [others_sum]})
-                df_agg = pd.concat([df_top, others_row], ignore_index=True)
-            else:
-                df_agg = df_top
-        
-        fig = px.pie(
-            df_agg, names=names_col, values=values_col,
-            title=config.get('title', f'Distribution of {values_col}'),
-            hole=0.0
-        )
-        
-        fig.update_traces(
-            textposition='inside',
-            textinfo='percent+label',
-            hovertemplate='<b>%{label}</b><br>Value: %{value}<br>Percentage: %{percent}<extra></extra>'
+                labels = labels.append(pd.Index(['Others']))
+                values = np.append(values, others_sum)
+        
+        return go.Figure(
+            data=[go.Pie(
+                labels=_typed_array(labels.to_numpy()), values=_typed_array(values),
+                hole=hole,
+                textposition='inside',
+                textinfo='percent+label',
+                hovertemplate='<b>%{label}</b><br>Value: %{value}<br>Percentage: %{percent}<extra></extra>',
+                showlegend=True,
+                _validate=False
+            )],
+            layout=dict(title=dict(text=config.get('title', f'Distribution of {values_col}'))),
+            _validate=False
         )
-        
-        return fig
     
-    def _create_donut_chart(self, df: pd.DataFrame, config: Dict[str, Any]) -> go.Figure:
+    def _create_donut_chart(self, df: pd.DataFrame, config: Dict[str, Any], columns: ColumnGroups) -> go.Figure:
         """Create donut chart (pie chart with hole)"""
-        fig = self._create_pie_chart(df, config)
-        fig.update_traces(hole=0.4)
-        return fig
+        return self._create_pie_chart(df, config, columns, hole=0.4)
     
-    def _create_scatter_chart(self, df: pd.DataFrame, config: Dict[str, Any]) -> go.Figure:
+    def _create_scatter_chart(self, df: pd.DataFrame, config: Dict[str, Any], columns: ColumnGroups) -> go.Figure:
         """Enhanced scatter plot creation"""
-        numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
+        numeric_cols = columns[0]
         
         if len(numeric_cols) < 2:
-            return self._create_bar_chart(df, config)
+            return self._create_bar_chart(df, config, columns)
         
         x_col = config.get('x_column', numeric_cols[0])
         y_col = config.get('y_column', numeric_cols[1])
         
-        fig = px.scatter(
-            df, x=x_col, y=y_col,
-            title=config.get('title', f'{y_col} vs {x_col}'),
-            opacity=0.7,
-            size_max=10
+        return go.Figure(
+            data=[go.Scatter(
+                x=_typed_array(df[x_col].to_numpy()), y=_typed_array(df[y_col].to_numpy()),
+                mode='markers',
+                marker=dict(opacity=0.7),
+                hovertemplate=_hovertemplate(x=x_col, y=y_col),
+                showlegend=False,
+                _validate=False
+            )],
+            layout=dict(
+                title=dict(text=config.get('title', f'{y_col} vs {x_col}')),
+                xaxis=dict(title=dict(text=str(x_col))),
+                yaxis=dict(title=dict(text=str(y_col)))
+            ),
+            _validate=False
         )
-        
-        return fig
     
-    def _create_histogram(self, df: pd.DataFrame, config: Dict[str, Any]) -> go.Figure:
+    def _create_histogram(self, df: pd.DataFrame, config: Dict[str, Any], columns: ColumnGroups) -> go.Figure:
         """Enhanced histogram creation"""
-        numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
+        numeric_cols = columns[0]
         
         if not numeric_cols:
-            return self._create_bar_chart(df, config)
+            return self._create_bar_chart(df, config, columns)
         
         x_col = config.get('x_column', numeric_cols[0])
-        
-        fig = px.histogram(
-            df, x=x_col,
-            title=config.get('title', f'Distribution of {x_col}'),
-            nbins=min(30, len(df.dropna()) // 2),
-            marginal="box"
+        x = _typed_array(df[x_col].to_numpy())
+        complete_rows = len(df) - int(df.isna().any(axis=1).sum())
+        
+        return go.Figure(
+            data=[
+                go.Histogram(
+                    x=x, nbinsx=min(30, complete_rows // 2), bingroup='x',
+                    hovertemplate=_hovertemplate(x=x_col, y='count'),
+                    showlegend=False,
+                    _validate=False
+                ),
+                go.Box(
+                    x=x, notched=True, xaxis='x2', yaxis='y2',
+                    hovertemplate=_hovertemplate(x=x_col),
+                    marker=dict(color=PLOT_TEMPLATE.layout.colorway[0]),
+                    showlegend=False,
+                    _validate=False
+                )
+            ],
+            layout=dict(
+                title=dict(text=config.get('title', f'Distribution of {x_col}')),
+                xaxis=dict(anchor='y', domain=[0.0, 1.0], title=dict(text=str(x_col))),
+                yaxis=dict(anchor='x', domain=[0.0, 0.8316], title=dict(text='count')),
+                xaxis2=dict(anchor='y2', domain=[0.0, 1.0], matches='x', showticklabels=False, showgrid=True),
+                yaxis2=dict(anchor='x2', domain=[0.8416, 1.0], matches='y2', showticklabels=False, showline=False, ticks='', showgrid=False),
+                barmode='relative'
+            ),
+            _validate=False
         )
-        
-        return fig
     
-    def _create_box_plot(self, df: pd.DataFrame, config: Dict[str, Any]) -> go.Figure:
+    def _create_box_plot(self, df: pd.DataFrame, config: Dict[str, Any], columns: ColumnGroups) -> go.Figure:
         """Enhanced box plot creation"""
-        numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
+        numeric_cols = columns[0]
         
         if not numeric_cols:
-            return self._create_bar_chart(df, config)
+            return self._create_bar_chart(df, config, columns)
         
         y_col = config.get('y_column', numeric_cols[0])
         
-        fig = px.box(
-            df, y=y_col,
-            title=config.get('title', f'Box Plot of {y_col}'),
-            points="outliers"
+        return go.Figure(
+            data=[go.Box(
+                y=_typed_array(df[y_col].to_numpy()), boxpoints='outliers',
+                hovertemplate=_hovertemplate(y=y_col),
+                showlegend=False,
+                _validate=False
+            )],
+            layout=dict(
+                title=dict(text=config.get('title', f'Box Plot of {y_col}')),
+                yaxis=dict(title=dict(text=str(y_col)))
+            ),
+            _validate=False
         )
-        
-        return fig
     
-    def _create_heatmap(self, df: pd.DataFrame, config: Dict[str, Any]) -> go.Figure:
+    def _create_heatmap(self, df: pd.DataFrame, config: Dict[str, Any], columns: ColumnGroups) -> go.Figure:
         """Create correlation heatmap for numeric data"""
-        numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
+        numeric_cols = columns[0]
         
         if len(numeric_cols) < 2:
-            return self._create_bar_chart(df, config)
-        
-        corr_matrix = df[numeric_cols].corr()
-        
-        fig = px.imshow(
-            corr_matrix,
-            title=config.get('title', 'Correlation Heatmap'),
-            color_continuous_scale='RdBu',
-            aspect="auto"
+            return self._create_bar_chart(df, config, columns)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr_matrix = np.corrcoef(df[numeric_cols].to_numpy(dtype=np.float64), rowvar=False)
+        labels = np.array(numeric_cols, dtype=object)
+        
+        return go.Figure(
+            data=[go.Heatmap(
+                z=_typed_array(corr_matrix), x=labels, y=labels,
+                coloraxis='coloraxis',
+                hovertemplate='x: %{x}<br>y: %{y}<br>color: %{z}<extra></extra>',
+                _validate=False
+            )],
+            layout=dict(
+                title=dict(text=config.get('title', 'Correlation Heatmap')),
+                yaxis=dict(autorange='reversed'),
+                coloraxis=dict(colorscale=RDBU_SCALE)
+            ),
+            _validate=False
         )
-        
-        return fig
     
-    def _create_area_chart(self, df: pd.DataFrame, config: Dict[str, Any]) -> go.Figure:
+    def _create_area_chart(self, df: pd.DataFrame, config: Dict[str, Any], columns: ColumnGroups) -> go.Figure:
         """Create area chart"""
-        x_col, y_col = self._get_best_columns(df)
+        x_col, y_col = self._get_best_columns(df, columns)
         x_col = config.get('x_column', x_col)
         y_col = config.get('y_column', y_col)
         
-        fig = px.area(
-            df, x=x_col, y=y_col,
-            title=config.get('title', f'{y_col} over {x_col}')
+        return go.Figure(
+            data=[go.Scatter(
+                x=_typed_array(df[x_col].to_numpy()), y=_typed_array(df[y_col].to_numpy()),
+                mode='lines',
+                stackgroup='1',
+                hovertemplate=_hovertemplate(x=x_col, y=y_col),
+                showlegend=False,
+                _validate=False
+            )],
+            layout=dict(
+                title=dict(text=config.get('title', f'{y_col} over {x_col}')),
+                xaxis=dict(title=dict(text=str(x_col))),
+                yaxis=dict(title=dict(text=str(y_col)))
+            ),
+            _validate=False
         )
-        
-        return fig
     
     def _create_fallback_chart(self, df: pd.DataFrame, error_msg: str) -> str:
         """Create a simple fallback chart when main chart creation fails"""
@@ -389,32 +579,18 @@ class ChartGenerator:
 
     def get_available_chart_types(self) -> List[str]:
         """Get list of available chart types"""
-        return list(self.chart_types.keys())
+        return list(self.CHART_TYPES)
     
-    def validate_data_for_chart(self, df: pd.DataFrame, chart_type: str) -> Tuple[bool, str]:
+    def validate_data_for_chart(self, df: pd.DataFrame, chart_type: str, columns: ColumnGroups = None) -> Tuple[bool, str]:
         """Validate if data is suitable for the requested chart type"""
         if df.empty:
             return False, "Data is empty"
         
-        numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
-        categorical_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
-        
-        validations = {
-            'pie': (len(categorical_cols) >= 1 and len(numeric_cols) >= 1, 
-                   "Pie charts need at least one categorical and one numeric column"),
-            'scatter': (len(numeric_cols) >= 2, 
-                       "Scatter plots need at least two numeric columns"),
-            'heatmap': (len(numeric_cols) >= 2, 
-                       "Heatmaps need at least two numeric columns"),
-            'histogram': (len(numeric_cols) >= 1, 
-                         "Histograms need at least one numeric column"),
-            'box': (len(numeric_cols) >= 1, 
-                   "Box plots need at least one numeric column")
-        }
-        
-        if chart_type in validations:
-            condition, message = validations[chart_type]
-            if not condition:
+        requirement = CHART_REQUIREMENTS.get(chart_type)
+        if requirement:
+            min_categorical, min_numeric, message = requirement
+            numeric_cols, categorical_cols, _ = columns or self._classify_columns(df)
+            if len(categorical_cols) < min_categorical or len(numeric_cols) < min_numeric:
                 return False, message
         
         return True, "Data is valid for this chart type"
@@ -422,10 +598,29 @@ class ChartGenerator:
     def create_chart_with_validation(self, df: pd.DataFrame, chart_type: str, config: Dict[str, Any] = None) -> Dict[str, Any]:
         """Create chart with comprehensive validation and error handling"""
         try:
-            is_valid, validation_message = self.validate_data_for_chart(df, chart_type)
+            return self._create_from_prepared(self._prepare(df, config), chart_type, config)
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'suggested_chart_type': 'bar',
+                'chart_data': None
+            }
+    
+    def _prepare(self, df: pd.DataFrame, config: Dict[str, Any] = None) -> Tuple[pd.DataFrame, ColumnGroups, pd.DataFrame, Dict[str, Any]]:
+        """Classify, preprocess and summarize a frame once so several charts can share the work"""
+        columns = self._classify_columns(df)
+        df_processed = self._preprocess_data(df, columns, not (config or {}).get('preserve_precision'))
+        return df, columns, df_processed, self._generate_data_summary(df, columns)
+    
+    def _create_from_prepared(self, prepared: Tuple, chart_type: str, config: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Validate and create one chart from the output of _prepare"""
+        df, columns, df_processed, summary = prepared
+        try:
+            is_valid, validation_message = self.validate_data_for_chart(df, chart_type, columns)
             
             if not is_valid:
-                suggested_type = self.suggest_chart_type(df)
+                suggested_type = self.suggest_chart_type(df, columns=columns)
                 return {
                     'success': False,
                     'error': validation_message,
@@ -433,13 +628,13 @@ class ChartGenerator:
                     'chart_data': None
                 }
             
-            chart_json = self.create_chart(df, chart_type, config)
+            chart_json = self._render_chart(df, df_processed, chart_type, config or {}, columns)
             
             return {
                 'success': True,
                 'chart_data': chart_json,
                 'chart_type': chart_type,
-                'data_summary': self._generate_data_summary(df)
+                'data_summary': summary
             }
             
         except Exception as e:
@@ -450,21 +645,24 @@ class ChartGenerator:
                 'chart_data': None
             }
     
-    def _generate_data_summary(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def _generate_data_summary(self, df: pd.DataFrame, columns: ColumnGroups = None) -> Dict[str, Any]:
         """Generate summary statistics for the data"""
+        numeric_cols, categorical_cols, _ = columns or self._classify_columns(df)
         return {
             'total_rows': len(df),
             'total_columns': len(df.columns),
-            'numeric_columns': len(df.select_dtypes(include=['number']).columns),
-            'categorical_columns': len(df.select_dtypes(include=['object', 'category']).columns),
+            'numeric_columns': len(numeric_cols),
+            'categorical_columns': len(categorical_cols),
             'missing_values': df.isnull().sum().sum(),
             'column_names': df.columns.tolist()
         }
 
     def create_multiple_charts(self, df: pd.DataFrame, chart_types: List[str] = None) -> Dict[str, Dict[str, Any]]:
         """Create multiple chart types for the same data"""
+        prepared = self._prepare(df)
+        
         if chart_types is None:
-            suggested = self.suggest_chart_type(df)
+            suggested = self.suggest_chart_type(df, columns=prepared[1])
             chart_types = [suggested]
             
             if suggested == 'bar':
@@ -478,17 +676,16 @@ class ChartGenerator:
         
         results = {}
         for chart_type in chart_types[:3]:
-            result = self.create_chart_with_validation(df, chart_type)
-            results[chart_type] = result
+            results[chart_type] = self._create_from_prepared(prepared, chart_type)
         
         return results
 
     def get_chart_recommendations(self, df: pd.DataFrame, user_query: str = "") -> Dict[str, Any]:
         """Get chart recommendations based on data characteristics and user query"""
-        primary_suggestion = self.suggest_chart_type(df, user_query)
+        columns = self._classify_columns(df)
+        primary_suggestion = self.suggest_chart_type(df, user_query, columns)
         
-        numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
-        categorical_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
+        numeric_cols, categorical_cols, _ = columns
         
         recommendations = {
             'primary_suggestion': primary_suggestion,
@@ -502,8 +699,8 @@ class ChartGenerator:
         }
         
         all_suitable = []
-        for chart_type in self.chart_types.keys():
-            is_valid, _ = self.validate_data_for_chart(df, chart_type)
+        for chart_type in self.CHART_TYPES:
+            is_valid, _ = self.validate_data_for_chart(df, chart_type, columns)
             if is_valid and chart_type != primary_suggestion:
                 all_suitable.append(chart_type)
         
@@ -518,4 +715,18 @@ class ChartGenerator:
         else:
             recommendations['reasoning'] = "Limited data structure, using basic visualization"
         
-        return recommendations
\ No newline at end of file
+        return recommendations
+    
+    CHART_BUILDERS = {
+        'bar': _create_bar_chart,
+        'line': _create_line_chart,
+        'pie': _create_pie_chart,
+        'scatter': _create_scatter_chart,
+        'histogram': _create_histogram,
+        'box': _create_box_plot,
+        'heatmap': _create_heatmap,
+        'area': _create_area_chart,
+        'donut': _create_donut_chart
+    }
+    
+    CHART_TYPES = tuple(CHART_BUILDERS)
@@ -1,27 +1,203 @@
-from groq import Groq
+from groq import Groq, AsyncGroq, DEFAULT_CONNECTION_LIMITS, DEFAULT_TIMEOUT
+import ast
+import asyncio
+import httpx
 import sqlite3
+import threading
+import numpy as np
 import pandas as pd
 import json
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from itertools import repeat
 from typing import Dict, List, Any, Tuple
 import re
 import os
 from datetime import datetime
 
+try:
+    import h2
+    http2_available = True
+except ImportError:
+    http2_available = False
+
+try:
+    import numexpr
+    numexpr_available = True
+except ImportError:
+    numexpr_available = False
+
+@lru_cache(maxsize=None)
+def get_groq_client(api_key: str) -> Groq:
+    """Return one shared Groq client per API key so processors reuse its keep-alive connections"""
+    http_client = httpx.Client(
+        http2=http2_available,
+        limits=DEFAULT_CONNECTION_LIMITS,
+        timeout=DEFAULT_TIMEOUT,
+        follow_redirects=True
+    )
+    return Groq(api_key=api_key, http_client=http_client)
+
+def get_async_groq_client(api_key: str) -> AsyncGroq:
+    """Return a new asyncio Groq client for the running event loop; the caller must close it"""
+    http_client = httpx.AsyncClient(
+        http2=http2_available,
+        limits=DEFAULT_CONNECTION_LIMITS,
+        timeout=DEFAULT_TIMEOUT,
+        follow_redirects=True
+    )
+    return AsyncGroq(api_key=api_key, http_client=http_client)
+
+RESULT_CACHE_SIZE = 128
+SQL_CACHE_SIZE = 512
+STREAM_BATCH_SIZE = 1000
+SLOW_QUERY_ROW_LIMIT = 100_000
+SLOW_QUERY_ERROR = 'Query would scan a large table without an index; try adding a filter on msku, date or marketplace'
+
+_UNSAFE_SQL_RE = re.compile(r'\b(?:DROP|DELETE|UPDATE|INSERT|ALTER|CREATE)\b|--|/\*|\*/|;.*\w', re.I)
+
+SALES_INDEXES = {
+    'idx_sales_msku': 'sales_data(msku)',
+    'idx_sales_date': 'sales_data(date)',
+    'idx_sales_marketplace_total': 'sales_data(marketplace, total)',
+}
+
+INDEXES = {
+    **SALES_INDEXES,
+    'idx_inventory_msku': 'inventory(msku)',
+    'idx_returns_msku': 'returns_data(msku)',
+}
+
+SQL_SYSTEM_PROMPT = """You are a SQL expert. Convert natural language queries to SQL based on this database schema:
+
+{schema}
+
+IMPORTANT RULES:
+1. ONLY return the SQL query, nothing else
+2. Use proper SQLite syntax
+3. If the query is unclear or unsafe, return exactly: INVALID_QUERY
+4. Focus on SELECT statements primarily
+5. Use appropriate JOINs when referencing multiple tables
+6. For aggregations, use GROUP BY appropriately
+7. Always use proper WHERE clauses for filtering
+
+EXAMPLES:
+User: "Show me top selling products"
+Response: SELECT msku, SUM(quantity) as total_sold FROM sales_data GROUP BY msku ORDER BY total_sold DESC LIMIT 10
+
+User: "What's the current inventory for all products?"
+Response: SELECT msku, current_stock, available_stock FROM inventory
+
+User: "Show sales by marketplace"
+Response: SELECT marketplace, COUNT(*) as order_count, SUM(total) as total_sales FROM sales_data GROUP BY marketplace"""
+
+SQL_BATCH_PROMPT = """You will receive several numbered user queries instead of one. Apply the rules above to each query independently and return a JSON object of the form {"queries": [...]} with one SQL string per query, in order. Use the string INVALID_QUERY for any query that is unclear or unsafe."""
+
+_TEMPLATE_PREFIX = r"(?:(?:please\s+)?(?:show|list|get|give|display|find)(?:\s+me)?\s+|what(?:'s|\s+is|\s+are)\s+)?(?:the\s+|all\s+)?"
+
+SQL_TEMPLATES = tuple((re.compile(_TEMPLATE_PREFIX + pattern + r"[.?!]?", re.I), sql_query) for pattern, sql_query in (
+    (r"(?:top|best)[\s-]+selling\s+(?:products|items|mskus)",
+     "SELECT msku, SUM(quantity) as total_sold FROM sales_data GROUP BY msku ORDER BY total_sold DESC LIMIT 10"),
+    (r"(?:current\s+)?(?:inventory|stock(?:\s+levels?)?)(?:\s+(?:for|of)\s+all\s+products)?",
+     "SELECT msku, current_stock, available_stock FROM inventory"),
+    (r"(?:total\s+)?sales\s+(?:by|per)\s+marketplace",
+     "SELECT marketplace, COUNT(*) as order_count, SUM(total) as total_sales FROM sales_data GROUP BY marketplace"),
+))
+
+def _match_sql_template(user_query: str) -> str:
+    """Return the SQL of the template that the whole query matches, otherwise None"""
+    for pattern, sql_query in SQL_TEMPLATES:
+        if pattern.fullmatch(user_query):
+            return sql_query
+    return None
+
+_FULL_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(\w+)$')
+
+_BACKTICKED_NAME_RE = re.compile(r'`[^`]+`')
+_FIELD_EXPRESSION_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Name, ast.Load, ast.Constant,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.UAdd, ast.USub
+)
+
+def _is_arithmetic_expression(expression: str) -> bool:
+    """Whether an expression is only + - * / and parentheses over column names and numbers"""
+    try:
+        tree = ast.parse(_BACKTICKED_NAME_RE.sub('column', expression), mode='eval')
+    except SyntaxError:
+        return False
+    for node in ast.walk(tree):
+        if not isinstance(node, _FIELD_EXPRESSION_NODES):
+            return False
+        if isinstance(node, ast.Constant) and type(node.value) not in (int, float):
+            return False
+        if isinstance(node, ast.Name) and '__' in node.id:
+            return False
+    return True
+
+CALCULATED_FIELD_PROMPT = """You are a pandas expert. Given DataFrame columns and a field definition, describe the calculated field as a JSON object of the form {"column": "<new column name>", "expression": "<expression>"}.
+
+RULES:
+1. The expression must be pure arithmetic over existing column names, numbers, + - * / and parentheses
+2. Wrap column names that contain spaces in backticks
+3. Do not use Python statements, assignments or method calls
+
+EXAMPLES:
+Input: "Add profit margin as (price - cost) / price * 100"
+Output: {"column": "profit_margin", "expression": "(price - cost) / price * 100"}
+
+Input: "Add total sales as quantity * price"
+Output: {"column": "total_sales", "expression": "quantity * price"}"""
+
+MSKU_CATEGORIES = (
+    ('BRAND', 'Branded Products'),
+    ('ENTERTAINMENT', 'Entertainment'),
+    ('ELECTRONICS', 'Electronics'),
+    ('SUNGLASSES', 'Accessories'),
+    ('NUMERIC', 'Orders'),
+)
+
+@lru_cache(maxsize=65536)
+def _msku_category(msku: str) -> str:
+    """Return the category of the first MSKU_CATEGORIES keyword found in the MSKU, remembered across syncs"""
+    msku_upper = msku.upper()
+    for keyword, category in MSKU_CATEGORIES:
+        if keyword in msku_upper:
+            return category
+    return 'General'
+
 class SQLQueryProcessor:
-    def __init__(self, api_key: str = None, db_path: str = None):
+    def __init__(self, api_key: str = None, db_path: str = None, client: Groq = None):
         api_key = api_key or os.getenv('GROQ_API_KEY')
         if not api_key:
             raise ValueError("Groq API key is required. Set GROQ_API_KEY environment variable or pass api_key parameter.")
         
-        self.client = Groq(api_key=api_key)
+        self.api_key = api_key
+        self.client = client or get_groq_client(api_key)
         self.db_path = db_path or "wms_data.db"
         self.model = "llama3-8b-8192"
+        self._schema_cache = None
+        self._schema_version = None
+        self._system_prompt = None
+        self._sql_cache = OrderedDict()
+        self._lock = threading.RLock()
+        self._result_cache = OrderedDict()
+        self._result_cache_version = None
+        self.conn = self._connect()
         self.initialize_database()
     
+    def _connect(self) -> sqlite3.Connection:
+        """Open the processor's shared SQLite connection, tuned once for concurrent reads"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-65536")
+        return conn
+    
     def initialize_database(self):
         """Initialize SQLite database with sample schema"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.conn.cursor()
         
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS sales_data (
@@ -77,150 +253,257 @@ class SQLQueryProcessor:
         )
         ''')
         
-        conn.commit()
-        conn.close()
+        self._create_indexes(cursor)
+        self.conn.commit()
+    
+    def _create_indexes(self, cursor: sqlite3.Cursor):
+        """Create any of the AI table indexes that are missing"""
+        for name, target in INDEXES.items():
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
     
     def get_schema_info(self) -> str:
-        """Get database schema information for AI context"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        schema_info = []
-        
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        tables = cursor.fetchall()
-        
-        for table in tables:
-            table_name = table[0]
-            cursor.execute(f"PRAGMA table_info({table_name})")
-            columns = cursor.fetchall()
+        """Get database schema information for AI context, re-reading it from SQLite only after the schema changes"""
+        with self._lock:
+            schema_version = self.conn.execute("PRAGMA schema_version").fetchone()[0]
+            if self._schema_cache is not None and schema_version == self._schema_version:
+                return self._schema_cache
             
-            column_info = []
-            for col in columns:
-                column_info.append(f"{col[1]} ({col[2]})")
+            schema_info = []
             
-            schema_info.append(f"Table: {table_name}\nColumns: {', '.join(column_info)}")
-        
-        conn.close()
-        return "\n\n".join(schema_info)
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
+            tables = cursor.fetchall()
+            
+            for table in tables:
+                table_name = table[0]
+                cursor.execute(f"PRAGMA table_info({table_name})")
+                columns = cursor.fetchall()
+                
+                column_info = []
+                for col in columns:
+                    column_info.append(f"{col[1]} ({col[2]})")
+                
+                schema_info.append(f"Table: {table_name}\nColumns: {', '.join(column_info)}")
+            
+            self._schema_cache = "\n\n".join(schema_info)
+            self._schema_version = schema_version
+            self._system_prompt = None
+            self._sql_cache.clear()
+            return self._schema_cache
+    
+    def get_system_prompt(self) -> str:
+        """Get the text-to-SQL system prompt, rebuilt only when the schema changes"""
+        with self._lock:
+            schema = self.get_schema_info()
+            if self._system_prompt is None:
+                self._system_prompt = SQL_SYSTEM_PROMPT.format(schema=schema)
+            return self._system_prompt
     
     def text_to_sql(self, user_query: str) -> Tuple[str, bool]:
-        """Convert natural language query to SQL using Groq"""
-        schema = self.get_schema_info()
+        """Convert natural language query to SQL, locally for template questions and otherwise using Groq"""
+        user_query = ' '.join(user_query.split())
+        sql_query = _match_sql_template(user_query)
+        if sql_query:
+            return sql_query, True
         
-        system_prompt = f"""You are a SQL expert. Convert natural language queries to SQL based on this database schema:
-
-{schema}
-
-IMPORTANT RULES:
-1. ONLY return the SQL query, nothing else
-2. Use proper SQLite syntax
-3. If the query is unclear or unsafe, return exactly: INVALID_QUERY
-4. Focus on SELECT statements primarily
-5. Use appropriate JOINs when referencing multiple tables
-6. For aggregations, use GROUP BY appropriately
-7. Always use proper WHERE clauses for filtering
-
-EXAMPLES:
-User: "Show me top selling products"
-Response: SELECT msku, SUM(quantity) as total_sold FROM sales_data GROUP BY msku ORDER BY total_sold DESC LIMIT 10
-
-User: "What's the current inventory for all products?"
-Response: SELECT msku, current_stock, available_stock FROM inventory
-
-User: "Show sales by marketplace"
-Response: SELECT marketplace, COUNT(*) as order_count, SUM(total) as total_sales FROM sales_data GROUP BY marketplace"""
+        try:
+            return self._clean_sql(self._generate_sql(user_query))
+            
+        except Exception as e:
+            print(f"Error generating SQL with Groq: {e}")
+            return "INVALID_QUERY", False
+    
+    def _generate_sql(self, user_query: str) -> str:
+        """Ask Groq for the SQL of a whitespace-normalized query, remembering answers per schema version"""
+        request, cache_key, sql_query = self._cached_sql(user_query)
+        if sql_query is None:
+            response = self.client.chat.completions.create(**request)
+            sql_query = response.choices[0].message.content
+            self._remember_sql(cache_key, sql_query)
+        return sql_query
+    
+    def _cached_sql(self, user_query: str) -> Tuple[Dict[str, Any], Tuple[int, str], str]:
+        """Return the Groq request, cache key and any remembered SQL for a whitespace-normalized query"""
+        with self._lock:
+            request = self._sql_request(user_query)
+            cache_key = (self._schema_version, user_query)
+            sql_query = self._sql_cache.get(cache_key)
+            if sql_query is not None:
+                self._sql_cache.move_to_end(cache_key)
+            return request, cache_key, sql_query
+    
+    def _remember_sql(self, cache_key: Tuple[int, str], sql_query: str):
+        """Remember generated SQL unless the schema changed while it was being generated"""
+        with self._lock:
+            if cache_key[0] == self._schema_version:
+                self._sql_cache[cache_key] = sql_query
+                if len(self._sql_cache) > SQL_CACHE_SIZE:
+                    self._sql_cache.popitem(last=False)
+    
+    @asynccontextmanager
+    async def _async_client(self, aclient: AsyncGroq = None):
+        """Yield aclient if given, else a Groq client for the running event loop that is closed on exit"""
+        if aclient is not None:
+            yield aclient
+            return
+        async with get_async_groq_client(self.api_key) as aclient:
+            yield aclient
+    
+    async def text_to_sql_async(self, user_query: str, aclient: AsyncGroq = None) -> Tuple[str, bool]:
+        """Convert natural language query to SQL using Groq without blocking the event loop"""
+        user_query = ' '.join(user_query.split())
+        sql_query = _match_sql_template(user_query)
+        if sql_query:
+            return sql_query, True
         
+        try:
+            request, cache_key, sql_query = self._cached_sql(user_query)
+            if sql_query is None:
+                async with self._async_client(aclient) as client:
+                    response = await client.chat.completions.create(**request)
+                sql_query = response.choices[0].message.content
+                self._remember_sql(cache_key, sql_query)
+            return self._clean_sql(sql_query)
+            
+        except Exception as e:
+            print(f"Error generating SQL with Groq: {e}")
+            return "INVALID_QUERY", False
+    
+    def _sql_request(self, user_query: str) -> Dict[str, Any]:
+        """Build the chat completion arguments for a single text-to-SQL request"""
+        return dict(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": self.get_system_prompt()},
+                {"role": "user", "content": user_query}
+            ],
+            temperature=0.1,
+            max_tokens=300
+        )
+    
+    def text_to_sql_batch(self, user_queries: List[str]) -> List[Tuple[str, bool]]:
+        """Convert several natural language queries to SQL, answering template questions locally and the rest in one Groq call"""
+        templates = [_match_sql_template(' '.join(query.split())) for query in user_queries]
+        results = [(sql_query, True) if sql_query else None for sql_query in templates]
+        pending = [i for i, sql_query in enumerate(templates) if not sql_query]
+        if len(pending) == 1:
+            results[pending[0]] = self.text_to_sql(user_queries[pending[0]])
+        elif pending:
+            remote_results = self._text_to_sql_batch_remote([user_queries[i] for i in pending])
+            for i, result in zip(pending, remote_results):
+                results[i] = result
+        return results
+    
+    def _text_to_sql_batch_remote(self, user_queries: List[str]) -> List[Tuple[str, bool]]:
+        """Convert several natural language queries to SQL with one Groq call, falling back to one call per query"""
         try:
             response = self.client.chat.completions.create(
                 model=self.model,
                 messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_query}
+                    {"role": "system", "content": self.get_system_prompt()},
+                    {"role": "system", "content": SQL_BATCH_PROMPT},
+                    {"role": "user", "content": "\n".join(f"{i}. {query}" for i, query in enumerate(user_queries, 1))}
                 ],
                 temperature=0.1,
-                max_tokens=300
+                max_tokens=300 * len(user_queries),
+                response_format={"type": "json_object"}
             )
             
-            sql_query = response.choices[0].message.content.strip()
-            
-            sql_query = sql_query.replace('```sql', '').replace('```', '').strip()
-            
-            if "INVALID_QUERY" in sql_query or self._is_unsafe_query(sql_query):
-                return "INVALID_QUERY", False
-            
-            return sql_query, True
-            
+            sql_queries = json.loads(response.choices[0].message.content)['queries']
+            if isinstance(sql_queries, list) and len(sql_queries) == len(user_queries):
+                return [self._clean_sql(str(sql_query)) for sql_query in sql_queries]
         except Exception as e:
-            print(f"Error generating SQL with Groq: {e}")
+            print(f"Error generating SQL batch with Groq: {e}")
+        
+        return [self.text_to_sql(query) for query in user_queries]
+    
+    def _clean_sql(self, sql_query: str) -> Tuple[str, bool]:
+        """Strip markdown fences from generated SQL and reject invalid or unsafe queries"""
+        sql_query = sql_query.strip().replace('```sql', '').replace('```', '').strip()
+        
+        if "INVALID_QUERY" in sql_query or self._is_unsafe_query(sql_query):
             return "INVALID_QUERY", False
+        
+        return sql_query, True
     
     def _is_unsafe_query(self, query: str) -> bool:
         """Basic safety check for SQL queries"""
-        unsafe_patterns = [
-            r'\bDROP\b',
-            r'\bDELETE\b',
-            r'\bUPDATE\b',
-            r'\bINSERT\b',
-            r'\bALTER\b',
-            r'\bCREATE\b',
-            r'--',
-            r'/\*',
-            r'\*/',
-            r';.*\w'
-        ]
+        return bool(_UNSAFE_SQL_RE.search(query))
+    
+    def _is_slow_query(self, sql_query: str) -> bool:
+        """Check the query plan for a full scan, without any index, of a table above SLOW_QUERY_ROW_LIMIT rows"""
+        try:
+            with self._lock:
+                plan = self.conn.execute(f"EXPLAIN QUERY PLAN {sql_query}").fetchall()
+                row_counts = dict(self.conn.execute("SELECT tbl, MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1 GROUP BY tbl"))
+        except sqlite3.Error:
+            return False
         
-        query_upper = query.upper()
-        for pattern in unsafe_patterns:
-            if re.search(pattern, query_upper):
-                return True
+        for step in plan:
+            match = _FULL_SCAN_RE.match(step[3])
+            if match:
+                name = match.group(1)
+                aliased = re.search(rf'\b(?:FROM|JOIN)\s+(\w+)\s+(?:AS\s+)?{name}\b', sql_query, re.I)
+                if row_counts.get(aliased.group(1) if aliased else name, 0) > SLOW_QUERY_ROW_LIMIT:
+                    return True
         return False
     
     def execute_query(self, sql_query: str) -> Tuple[pd.DataFrame, bool, str]:
-        """Execute SQL query and return results"""
+        """Execute SQL query and return results, reusing cached results while the database is unchanged"""
+        cache_key = ' '.join(sql_query.split())
         try:
-            conn = sqlite3.connect(self.db_path)
-            df = pd.read_sql_query(sql_query, conn)
-            conn.close()
-            return df, True, "Success"
+            with self._lock:
+                data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+                if data_version != self._result_cache_version:
+                    self._result_cache.clear()
+                    self._result_cache_version = data_version
+                
+                df = self._result_cache.get(cache_key)
+                if df is not None:
+                    self._result_cache.move_to_end(cache_key)
+                    return df.copy(), True, "Success"
+                
+                try:
+                    cursor = self.conn.execute(sql_query)
+                    rows = cursor.fetchall()
+                finally:
+                    if self.conn.in_transaction:
+                        self.conn.rollback()
+                if cursor.description is None:
+                    self._result_cache.clear()
+                    return pd.DataFrame(), False, "Query did not return a result set"
+                
+                columns = [column[0] for column in cursor.description]
+                df = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+                self._result_cache[cache_key] = df
+                if len(self._result_cache) > RESULT_CACHE_SIZE:
+                    self._result_cache.popitem(last=False)
+            return df.copy(), True, "Success"
         except Exception as e:
             return pd.DataFrame(), False, str(e)
     
     def add_calculated_field(self, df: pd.DataFrame, field_definition: str) -> pd.DataFrame:
         """Add calculated fields to DataFrame using Groq AI"""
-        system_prompt = """You are a pandas expert. Given a DataFrame and a field definition, provide ONLY the Python code to add the calculated field.
-
-RULES:
-1. Return ONLY the pandas assignment statement
-2. Use 'df' as the DataFrame variable name
-3. Handle potential errors with appropriate conditions
-4. Use proper pandas syntax
-
-EXAMPLES:
-Input: "Add profit margin as (price - cost) / price * 100"
-Output: df['profit_margin'] = ((df['price'] - df['cost']) / df['price'] * 100).fillna(0)
-
-Input: "Add total sales as quantity * price"
-Output: df['total_sales'] = df['quantity'] * df['price']"""
-        
         try:
             response = self.client.chat.completions.create(
                 model=self.model,
                 messages=[
-                    {"role": "system", "content": system_prompt},
+                    {"role": "system", "content": CALCULATED_FIELD_PROMPT},
                     {"role": "user", "content": f"DataFrame columns: {list(df.columns)}\nField to add: {field_definition}"}
                 ],
                 temperature=0.1,
-                max_tokens=150
+                max_tokens=150,
+                response_format={"type": "json_object"}
             )
             
-            code = response.choices[0].message.content.strip()
+            field = json.loads(response.choices[0].message.content)
+            column, expression = str(field['column']).strip(), str(field['expression']).strip()
             
-            code = code.replace('```python', '').replace('```', '').strip()
+            if not column or not _is_arithmetic_expression(expression):
+                raise ValueError(f"Unsupported calculated field expression: {expression!r}")
             
-            local_vars = {'df': df, 'pd': pd}
-            exec(code, {"__builtins__": {}}, local_vars)
-            return local_vars['df']
+            df[column] = df.eval(expression, engine='numexpr' if numexpr_available else 'python')
+            return df
             
         except Exception as e:
             print(f"Error adding calculated field: {e}")
@@ -228,8 +511,66 @@ Output: df['total_sales'] = df['quantity'] * df['price']"""
     
     def process_natural_query(self, user_query: str) -> Dict[str, Any]:
         """Process a natural language query end-to-end"""
+        return self._process_sql(*self.text_to_sql(user_query))
+    
+    def process_natural_queries(self, user_queries: List[str]) -> List[Dict[str, Any]]:
+        """Process several natural language queries end-to-end, generating their SQL in one batch"""
+        return [self._process_sql(sql_query, sql_success) for sql_query, sql_success in self.text_to_sql_batch(user_queries)]
+    
+    def process_natural_query_stream(self, user_query: str, batch_size: int = STREAM_BATCH_SIZE):
+        """Process a natural language query end-to-end, yielding a header and then lists of up to batch_size row records"""
         sql_query, sql_success = self.text_to_sql(user_query)
         
+        if not sql_success:
+            yield {
+                'success': False,
+                'error': 'Could not convert query to SQL',
+                'sql_query': None
+            }
+            return
+        
+        if self._is_slow_query(sql_query):
+            yield {
+                'success': False,
+                'error': SLOW_QUERY_ERROR,
+                'sql_query': sql_query
+            }
+            return
+        
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        try:
+            conn.execute("PRAGMA query_only=ON")
+            cursor = conn.execute(sql_query)
+            columns = [column[0] for column in cursor.description or ()]
+            yield {
+                'success': True,
+                'sql_query': sql_query,
+                'columns': columns
+            }
+            
+            while batch := cursor.fetchmany(batch_size):
+                yield [dict(zip(columns, row)) for row in batch]
+        except sqlite3.Error as e:
+            yield {
+                'success': False,
+                'error': str(e),
+                'sql_query': sql_query
+            }
+        finally:
+            conn.close()
+    
+    async def process_natural_query_async(self, user_query: str, aclient: AsyncGroq = None) -> Dict[str, Any]:
+        """Process a natural language query end-to-end, awaiting Groq and running SQLite in a worker thread"""
+        sql_query, sql_success = await self.text_to_sql_async(user_query, aclient)
+        return await asyncio.to_thread(self._process_sql, sql_query, sql_success)
+    
+    async def process_natural_queries_async(self, user_queries: List[str]) -> List[Dict[str, Any]]:
+        """Process several natural language queries with their Groq calls in flight concurrently on one client"""
+        async with self._async_client() as aclient:
+            return list(await asyncio.gather(*(self.process_natural_query_async(query, aclient) for query in user_queries)))
+    
+    def _process_sql(self, sql_query: str, sql_success: bool) -> Dict[str, Any]:
+        """Execute generated SQL and package the result for the caller"""
         if not sql_success:
             return {
                 'success': False,
@@ -238,6 +579,14 @@ Output: df['total_sales'] = df['quantity'] * df['price']"""
                 'data': None
             }
         
+        if self._is_slow_query(sql_query):
+            return {
+                'success': False,
+                'error': SLOW_QUERY_ERROR,
+                'sql_query': sql_query,
+                'data': None
+            }
+        
         df, exec_success, error_msg = self.execute_query(sql_query)
         
         if not exec_success:
@@ -256,156 +605,176 @@ Output: df['total_sales'] = df['quantity'] * df['price']"""
             'row_count': len(df)
         }
 
-    def sync_with_uploaded_data(self, sku_mapper_instance):
-        """Sync the AI database with actual uploaded data"""
-        try:
-            if not sku_mapper_instance or not hasattr(sku_mapper_instance, 'processed_data') or sku_mapper_instance.processed_data is None:
-                print("❌ No processed data found to sync")
-                return False
-            
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("DELETE FROM sales_data")
-            cursor.execute("DELETE FROM products") 
-            cursor.execute("DELETE FROM inventory")
-            print("🧹 Cleared existing sample data")
-            
-            df = sku_mapper_instance.processed_data
-            print(f"📊 Syncing {len(df)} records")
-            
-            original_sku_col = None
-            for col in df.columns:
-                if col not in ['MSKU', 'processed_at', 'mapping_method'] and any(term in col.lower() for term in ['sku', 'product', 'item', 'order']):
-                    original_sku_col = col
-                    break
-            
-            if not original_sku_col:
-                original_sku_col = df.columns[0]
-            
-            print(f"Using '{original_sku_col}' as original SKU column")
-            
-            for idx, row in df.iterrows():
-                cursor.execute('''
-                INSERT INTO sales_data (order_id, sku, msku, quantity, price, total, date, marketplace, status)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    f'ORD_{idx+1:06d}',
-                    str(row.get(original_sku_col, '')),
-                    str(row.get('MSKU', 'UNKNOWN')),
-                    int(row.get('Quantity', 1)) if pd.notna(row.get('Quantity')) else 1,
-                    float(row.get('Price', 0)) if pd.notna(row.get('Price')) else 0,
-                    float(row.get('Total', 0)) if pd.notna(row.get('Total')) else 0,
-                    str(row.get('Order Date', '2025-01-01'))[:10],  # Ensure date format
-                    str(row.get('Marketplace', 'Direct')),
-                    'completed'
-                ))
-            
-            msku_counts = df['MSKU'].value_counts()
-            for msku, count in msku_counts.items():
-                if pd.isna(msku) or str(msku).startswith('UNCATEGORIZED'):
-                    continue
-                    
-                cursor.execute('''
+    def sync_with_uploaded_data(self, sku_mapper_instance, chunksize: int = 100_000):
+        """Sync the AI database with actual uploaded data, inserting sales rows chunksize at a time"""
+        with self._lock:
+            try:
+                if not sku_mapper_instance or not hasattr(sku_mapper_instance, 'processed_data') or sku_mapper_instance.processed_data is None:
+                    print("❌ No processed data found to sync")
+                    return False
+                
+                cursor = self.conn.cursor()
+                
+                cursor.execute("DELETE FROM sales_data")
+                cursor.execute("DELETE FROM products") 
+                cursor.execute("DELETE FROM inventory")
+                print("🧹 Cleared existing sample data")
+                
+                df = sku_mapper_instance.processed_data
+                print(f"📊 Syncing {len(df)} records")
+                
+                original_sku_col = None
+                for col in df.columns:
+                    if col not in ['MSKU', 'processed_at', 'mapping_method'] and any(term in col.lower() for term in ['sku', 'product', 'item', 'order']):
+                        original_sku_col = col
+                        break
+                
+                if not original_sku_col:
+                    original_sku_col = df.columns[0]
+                
+                print(f"Using '{original_sku_col}' as original SKU column")
+                
+                for name in SALES_INDEXES:
+                    cursor.execute(f"DROP INDEX IF EXISTS {name}")
+                
+                for start in range(0, len(df), chunksize):
+                    cursor.executemany('''
+                    INSERT INTO sales_data (order_id, sku, msku, quantity, price, total, date, marketplace, status)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', self._sales_rows(df.iloc[start:start + chunksize], original_sku_col))
+                
+                self._create_indexes(cursor)
+                
+                msku_groups = df.groupby('MSKU', sort=False, observed=True)
+                msku_stats = pd.DataFrame({
+                    'count': msku_groups.size(),
+                    'price': msku_groups['Price'].mean() if 'Price' in df.columns else 10.0
+                }).sort_values('count', ascending=False, kind='stable')
+                product_groups = [
+                    (str(msku), count, float(price)) for msku, count, price in msku_stats.itertuples()
+                    if not str(msku).startswith('UNCATEGORIZED')
+                ]
+                today = datetime.now().strftime('%Y-%m-%d')
+                
+                cursor.executemany('''
                 INSERT OR REPLACE INTO products (msku, product_name, category, price, description, status)
                 VALUES (?, ?, ?, ?, ?, ?)
-                ''', (
-                    str(msku),
-                    str(msku).replace('_', ' ').title(),
-                    self._categorize_msku(str(msku)),
-                    float(df[df['MSKU'] == msku]['Price'].mean()) if 'Price' in df.columns else 10.0,
+                ''', [(
+                    msku,
+                    msku.replace('_', ' ').title(),
+                    self._categorize_msku(msku),
+                    price,
                     f'Intelligent auto-categorized product group with {count} items',
                     'active'
-                ))
-            
-            for msku, count in msku_counts.items():
-                if pd.isna(msku) or str(msku).startswith('UNCATEGORIZED'):
-                    continue
-                    
-                cursor.execute('''
+                ) for msku, count, price in product_groups])
+                
+                cursor.executemany('''
                 INSERT OR REPLACE INTO inventory (msku, current_stock, reserved_stock, available_stock, reorder_level, last_updated, location)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    str(msku),
+                ''', [(
+                    msku,
                     count * 10,
-                    count,       
-                    count * 9,  
-                    max(5, count // 2), 
-                    datetime.now().strftime('%Y-%m-%d'),
+                    count,
+                    count * 9,
+                    max(5, count // 2),
+                    today,
                     'Warehouse A'
-                ))
-            
-            conn.commit()
-            conn.close()
-            
-            print(f"✅ Successfully synced {len(df)} records with AI database")
-            print(f"📦 Created {len(msku_counts)} product groups")
-            return True
-            
-        except Exception as e:
-            print(f"❌ Error syncing data: {e}")
-            return False
+                ) for msku, count, _ in product_groups])
+                
+                cursor.execute("ANALYZE")
+                self.conn.commit()
+                self._result_cache.clear()
+                
+                print(f"✅ Successfully synced {len(df)} records with AI database")
+                print(f"📦 Created {len(msku_stats)} product groups")
+                return True
+                
+            except Exception as e:
+                self.conn.rollback()
+                print(f"❌ Error syncing data: {e}")
+                return False
+
+    def _sales_rows(self, chunk: pd.DataFrame, sku_col: str):
+        """Build sales_data insert tuples for a chunk of processed rows, column by column"""
+        def column(name, default):
+            return chunk[name].tolist() if name in chunk.columns else [default] * len(chunk)
+        
+        def numbers(name, default, cast):
+            if name not in chunk.columns:
+                return [cast(default)] * len(chunk)
+            return chunk[name].fillna(default).astype(cast).tolist()
+        
+        def dates(name, default):
+            if name not in chunk.columns:
+                return repeat(default)
+            values = chunk[name]
+            if isinstance(values.dtype, np.dtype) and values.dtype.kind == 'M':
+                return np.datetime_as_string(values.to_numpy(), unit='D').tolist()
+            return values.astype(str).str.slice(0, 10).tolist()
+        
+        return zip(
+            map('ORD_{:06d}'.format, (chunk.index + 1).tolist()),
+            map(str, column(sku_col, '')),
+            map(str, column('MSKU', 'UNKNOWN')),
+            numbers('Quantity', 1, int),
+            numbers('Price', 0, float),
+            numbers('Total', 0, float),
+            dates('Order Date', '2025-01-01'),
+            map(str, column('Marketplace', 'Direct')),
+            repeat('completed')
+        )
 
     def _categorize_msku(self, msku):
         """Categorize MSKU for product table"""
-        msku_upper = msku.upper()
-        
-        if 'BRAND' in msku_upper:
-            return 'Branded Products'
-        elif 'ENTERTAINMENT' in msku_upper:
-            return 'Entertainment'  
-        elif 'ELECTRONICS' in msku_upper:
-            return 'Electronics'
-        elif 'SUNGLASSES' in msku_upper:
-            return 'Accessories'
-        elif 'NUMERIC' in msku_upper:
-            return 'Orders'
-        else:
-            return 'General'
+        return _msku_category(msku)
 
     def insert_sample_data(self):
-        """Insert sample data for testing"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        sample_sales = [
-            ('ORD001', 'SKU001', 'MSKU001', 5, 19.99, 99.95, '2024-01-01', 'Amazon', 'completed'),
-            ('ORD002', 'SKU002', 'MSKU002', 3, 29.99, 89.97, '2024-01-02', 'eBay', 'completed'),
-            ('ORD003', 'SKU001', 'MSKU001', 2, 19.99, 39.98, '2024-01-03', 'Amazon', 'completed'),
-            ('ORD004', 'SKU003', 'MSKU003', 1, 49.99, 49.99, '2024-01-04', 'Shopify', 'completed'),
-            ('ORD005', 'SKU002', 'MSKU002', 4, 29.99, 119.96, '2024-01-05', 'eBay', 'completed'),
-        ]
-        
-        cursor.executemany('''
-        INSERT OR REPLACE INTO sales_data 
-        (order_id, sku, msku, quantity, price, total, date, marketplace, status)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', sample_sales)
-        
-        sample_products = [
-            ('MSKU001', 'Wireless Headphones', 'Electronics', 19.99, 'Bluetooth wireless headphones', 'active'),
-            ('MSKU002', 'Coffee Mug', 'Home & Kitchen', 29.99, 'Ceramic coffee mug', 'active'),
-            ('MSKU003', 'Desk Lamp', 'Office', 49.99, 'LED desk lamp with adjustable brightness', 'active'),
-        ]
-        
-        cursor.executemany('''
-        INSERT OR REPLACE INTO products 
-        (msku, product_name, category, price, description, status)
-        VALUES (?, ?, ?, ?, ?, ?)
-        ''', sample_products)
-        
-        sample_inventory = [
-            ('MSKU001', 150, 10, 140, 20, '2024-01-01', 'Warehouse A'),
-            ('MSKU002', 200, 15, 185, 30, '2024-01-01', 'Warehouse B'),
-            ('MSKU003', 75, 5, 70, 15, '2024-01-01', 'Warehouse A'),
-        ]
-        
-        cursor.executemany('''
-        INSERT OR REPLACE INTO inventory 
-        (msku, current_stock, reserved_stock, available_stock, reorder_level, last_updated, location)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', sample_inventory)
-        
-        conn.commit()
-        conn.close()
-        print("Sample data inserted successfully!")
\ No newline at end of file
+        """Insert sample data for testing, skipping databases that already hold sales data"""
+        with self._lock:
+            cursor = self.conn.cursor()
+            
+            cursor.execute("SELECT 1 FROM sales_data LIMIT 1")
+            if cursor.fetchone():
+                return
+            
+            sample_sales = [
+                ('ORD001', 'SKU001', 'MSKU001', 5, 19.99, 99.95, '2024-01-01', 'Amazon', 'completed'),
+                ('ORD002', 'SKU002', 'MSKU002', 3, 29.99, 89.97, '2024-01-02', 'eBay', 'completed'),
+                ('ORD003', 'SKU001', 'MSKU001', 2, 19.99, 39.98, '2024-01-03', 'Amazon', 'completed'),
+                ('ORD004', 'SKU003', 'MSKU003', 1, 49.99, 49.99, '2024-01-04', 'Shopify', 'completed'),
+                ('ORD005', 'SKU002', 'MSKU002', 4, 29.99, 119.96, '2024-01-05', 'eBay', 'completed'),
+            ]
+            
+            cursor.executemany('''
+            INSERT OR IGNORE INTO sales_data 
+            (order_id, sku, msku, quantity, price, total, date, marketplace, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', sample_sales)
+            
+            sample_products = [
+                ('MSKU001', 'Wireless Headphones', 'Electronics', 19.99, 'Bluetooth wireless headphones', 'active'),
+                ('MSKU002', 'Coffee Mug', 'Home & Kitchen', 29.99, 'Ceramic coffee mug', 'active'),
+                ('MSKU003', 'Desk Lamp', 'Office', 49.99, 'LED desk lamp with adjustable brightness', 'active'),
+            ]
+            
+            cursor.executemany('''
+            INSERT OR IGNORE INTO products 
+            (msku, product_name, category, price, description, status)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ''', sample_products)
+            
+            sample_inventory = [
+                ('MSKU001', 150, 10, 140, 20, '2024-01-01', 'Warehouse A'),
+                ('MSKU002', 200, 15, 185, 30, '2024-01-01', 'Warehouse B'),
+                ('MSKU003', 75, 5, 70, 15, '2024-01-01', 'Warehouse A'),
+            ]
+            
+            cursor.executemany('''
+            INSERT OR IGNORE INTO inventory 
+            (msku, current_stock, reserved_stock, available_stock, reorder_level, last_updated, location)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', sample_inventory)
+            
+            self.conn.commit()
+            self._result_cache.clear()
+            print("Sample data inserted successfully!")
\ No newline at end of file
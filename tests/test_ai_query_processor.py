@@ -0,0 +1,56 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from part4_ai_layer.ai_query_processor import AIQueryProcessor, _match_local_intent
+from tests.test_database import RecordingClient
+
+@pytest.fixture
+def ai_processor(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    processor = AIQueryProcessor(api_key='test-key')
+    yield processor
+    processor.sql_processor.conn.close()
+
+def use_client(ai_processor, client):
+    ai_processor.client = ai_processor.sql_processor.client = client
+    return client
+
+def test_batch_queries_generate_their_sql_in_one_completion(ai_processor):
+    client = use_client(ai_processor, RecordingClient(json.dumps({'queries': [
+        "SELECT msku, product_name FROM products", "SELECT msku, current_stock FROM inventory"
+    ]})))
+
+    results = ai_processor.process_user_queries(['show products with their names', 'list stock per msku'])
+
+    assert len(client.calls) == 1
+    assert [result['sql_query'] for result in results] == [
+        "SELECT msku, product_name FROM products", "SELECT msku, current_stock FROM inventory"
+    ]
+    assert all(result['success'] for result in results)
+
+@pytest.mark.parametrize('query, intent', [
+    ('calculate total sales', None),
+    ('which product line sells best', None),
+    ('how many boxes did we ship', 'data_query'),
+    ('create a bar chart of sales', 'chart_request'),
+    ('plot sales per marketplace', 'chart_request'),
+    ('visualize returns over time', 'chart_request'),
+    ('add a profit margin column', 'calculation'),
+    ('calculate a discount field from price', 'calculation'),
+    ('list all products', 'data_query'),
+])
+def test_local_intent_needs_an_unambiguous_signal(query, intent):
+    assert _match_local_intent(query) == intent
+
+def test_ambiguous_query_is_classified_remotely(ai_processor):
+    client = use_client(ai_processor, RecordingClient('data_query', "SELECT SUM(total) AS total_sales FROM sales_data"))
+
+    result = ai_processor.process_user_query('calculate total sales for the ambiguous intent test')
+
+    assert client.calls[0]['max_tokens'] == 20
+    assert result['success'] and result['sql_query'] == "SELECT SUM(total) AS total_sales FROM sales_data"
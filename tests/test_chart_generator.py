@@ -0,0 +1,109 @@
+import base64
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from part4_ai_layer.chart_generator import ChartGenerator
+
+@pytest.fixture
+def generator():
+    return ChartGenerator()
+
+def render(generator, df, chart_type, config=None):
+    return json.loads(generator.create_chart(df, chart_type, config))
+
+@pytest.mark.parametrize('chart_type, title', [('bar', 'b by a'), ('pie', 'Distribution of b')])
+def test_object_value_column_is_aggregated_without_categoricals(generator, chart_type, title):
+    df = pd.DataFrame({'a': [f'k{i % 5}' for i in range(30)], 'b': [f'v{i % 3}' for i in range(30)]})
+
+    chart = render(generator, df, chart_type)
+
+    assert chart['layout']['title']['text'] == title
+    assert chart['data'][0]['type'] == chart_type
+
+SALES = pd.DataFrame({
+    'region': ['north', 'south', 'east', 'west'] * 3,
+    'sales': [120, 340, 560, 780, 150, 320, 510, 700, 90, 400, 610, 820],
+    'profit': [12.5, 30.25, 50.0, 70.75, 14.5, 28.0, 49.5, 66.25, 8.0, 41.5, 60.0, 79.75],
+    'units': [3, 9, 14, 20, 4, 8, 13, 18, 2, 10, 15, 21],
+})
+
+def decode(values):
+    """Decode a plotly.js typed-array spec back to numpy, passing plain lists through"""
+    if isinstance(values, dict):
+        array = np.frombuffer(base64.b64decode(values['bdata']), dtype=np.dtype(values['dtype']).newbyteorder('<'))
+        if 'shape' in values:
+            array = array.reshape([int(size) for size in values['shape'].split(',')])
+        return array
+    return np.asarray(values)
+
+def region_totals(column):
+    return SALES.groupby('region', sort=False)[column].sum()
+
+@pytest.mark.parametrize('chart_type, trace_types, title', [
+    ('bar', ['bar'], 'sales by region'),
+    ('line', ['scatter'], 'sales over region'),
+    ('area', ['scatter'], 'sales over region'),
+    ('pie', ['pie'], 'Distribution of sales'),
+    ('donut', ['pie'], 'Distribution of sales'),
+    ('scatter', ['scatter'], 'profit vs sales'),
+    ('histogram', ['histogram', 'box'], 'Distribution of sales'),
+    ('box', ['box'], 'Box Plot of sales'),
+    ('heatmap', ['heatmap'], 'Correlation Heatmap'),
+])
+def test_chart_json_has_trace_type_and_title(generator, chart_type, trace_types, title):
+    chart = render(generator, SALES, chart_type)
+
+    assert [trace['type'] for trace in chart['data']] == trace_types
+    assert chart['layout']['title']['text'] == title
+
+@pytest.mark.parametrize('chart_type', ['bar', 'line', 'area'])
+def test_category_charts_round_trip_values(generator, chart_type):
+    trace = render(generator, SALES, chart_type)['data'][0]
+
+    assert list(trace['x']) == SALES['region'].tolist()
+    assert set(trace['y']) == {'dtype', 'bdata'}
+    np.testing.assert_array_equal(decode(trace['y']), SALES['sales'])
+
+@pytest.mark.parametrize('chart_type, hole', [('pie', 0), ('donut', 0.4)])
+def test_pie_charts_round_trip_totals(generator, chart_type, hole):
+    trace = render(generator, SALES, chart_type)['data'][0]
+
+    totals = region_totals('sales')
+    assert trace.get('hole', 0) == hole
+    assert list(trace['labels']) == totals.index.tolist()
+    np.testing.assert_array_equal(decode(trace['values']), totals.to_numpy())
+
+def test_scatter_round_trips_both_axes(generator):
+    trace = render(generator, SALES, 'scatter')['data'][0]
+
+    np.testing.assert_array_equal(decode(trace['x']), SALES['sales'])
+    np.testing.assert_array_equal(decode(trace['y']), SALES['profit'])
+
+def test_histogram_and_box_round_trip_values(generator):
+    histogram, marginal = render(generator, SALES, 'histogram')['data']
+    box = render(generator, SALES, 'box')['data'][0]
+
+    np.testing.assert_array_equal(decode(histogram['x']), SALES['sales'])
+    np.testing.assert_array_equal(decode(marginal['x']), SALES['sales'])
+    np.testing.assert_array_equal(decode(box['y']), SALES['sales'])
+
+def test_heatmap_round_trips_correlation_matrix(generator):
+    trace = render(generator, SALES, 'heatmap')['data'][0]
+
+    numeric = ['sales', 'profit', 'units']
+    assert list(trace['x']) == numeric and list(trace['y']) == numeric
+    np.testing.assert_allclose(decode(trace['z']), SALES[numeric].corr().to_numpy())
+
+def test_large_integers_are_encoded_without_losing_precision(generator):
+    df = pd.DataFrame({'sku': ['a', 'b'], 'total': [2 ** 40, 2 ** 40 + 1]})
+
+    trace = render(generator, df, 'bar', {'preserve_precision': True})['data'][0]
+
+    np.testing.assert_array_equal(decode(trace['y']), df['total'])
@@ -0,0 +1,250 @@
+import asyncio
+import json
+import os
+import sys
+import types
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from part2_database.database_manager import BaserowManager
+from part4_ai_layer import text_to_sql
+from part4_ai_layer.text_to_sql import SQLQueryProcessor
+
+class RecordingClient:
+    """Groq stand-in that answers chat completions with the given contents in turn, repeating the last"""
+    def __init__(self, *contents):
+        self.contents = list(contents or ["SELECT msku FROM products"])
+        self.calls = []
+        self.chat = types.SimpleNamespace(completions=self)
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        content = self.contents.pop(0) if len(self.contents) > 1 else self.contents[0]
+        message = types.SimpleNamespace(content=content)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+class AsyncRecordingClient(RecordingClient):
+    """Async Groq stand-in that records completions and whether it was closed"""
+    def __init__(self, *contents):
+        super().__init__(*contents)
+        self.closed = False
+
+    async def create(self, **kwargs):
+        return super().create(**kwargs)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.closed = True
+
+@pytest.fixture
+def groq_client():
+    return RecordingClient()
+
+@pytest.fixture
+def processor(tmp_path, groq_client):
+    processor = SQLQueryProcessor(api_key='test-key', db_path=str(tmp_path / 'wms.db'), client=groq_client)
+    yield processor
+    processor.conn.close()
+
+def processed_sales(rows=50):
+    mskus = ['BRAND_A', 'ELECTRONICS_TV', 'GEN_1', 'UNCATEGORIZED_UNKNOWN', 'GEN_1']
+    return pd.DataFrame({
+        'Product SKU': [f'SKU{i % 7}' for i in range(rows)],
+        'MSKU': pd.Categorical([mskus[i % len(mskus)] for i in range(rows)]),
+        'Quantity': [i % 4 + 1 for i in range(rows)],
+        'Price': [10.0 + i for i in range(rows)],
+        'Order Date': pd.date_range('2024-01-01', periods=rows, freq='h'),
+    })
+
+def sync(processor, df, **kwargs):
+    return processor.sync_with_uploaded_data(types.SimpleNamespace(processed_data=df), **kwargs)
+
+def test_generated_sql_is_reused_until_the_schema_changes(processor, groq_client):
+    question = 'which warehouse products look unusual this week'
+
+    assert processor.text_to_sql(question)[1]
+    assert processor.text_to_sql(question)[1]
+    assert len(groq_client.calls) == 1
+
+    assert sync(processor, processed_sales())
+    processor.text_to_sql(question)
+    assert len(groq_client.calls) == 2
+
+def test_generated_sql_is_not_shared_between_processors(processor, groq_client, tmp_path):
+    question = 'which warehouse products look unusual this week'
+    other_client = RecordingClient("SELECT msku FROM inventory")
+    other = SQLQueryProcessor(api_key='test-key', db_path=str(tmp_path / 'other.db'), client=other_client)
+    try:
+        processor.text_to_sql(question)
+        assert other.text_to_sql(question) == ("SELECT msku FROM inventory", True)
+    finally:
+        other.conn.close()
+
+def table_count(processor, table):
+    return processor.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+def test_sync_inserts_every_row_across_chunks(processor):
+    df = processed_sales(rows=53)
+
+    assert sync(processor, df, chunksize=10)
+
+    assert table_count(processor, 'sales_data') == 53
+    assert table_count(processor, 'products') == 3
+    assert table_count(processor, 'inventory') == 3
+    order_ids = processor.conn.execute("SELECT order_id FROM sales_data ORDER BY id LIMIT 2").fetchall()
+    assert order_ids == [('ORD_000001',), ('ORD_000002',)]
+
+def test_sync_replaces_previous_rows_and_rebuilds_indexes(processor):
+    processor.insert_sample_data()
+    assert sync(processor, processed_sales(rows=20))
+    assert sync(processor, processed_sales(rows=8), chunksize=3)
+
+    assert table_count(processor, 'sales_data') == 8
+    indexes = {row[0] for row in processor.conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+    assert {'idx_sales_msku', 'idx_sales_date', 'idx_sales_marketplace_total'} <= indexes
+
+def test_sync_inventory_counts_match_msku_groups(processor):
+    df = processed_sales(rows=50)
+    assert sync(processor, df)
+
+    inventory = dict(processor.conn.execute("SELECT msku, current_stock FROM inventory").fetchall())
+    expected = df['MSKU'].astype(str).value_counts()
+    expected = expected[~expected.index.str.startswith('UNCATEGORIZED')]
+    assert inventory == {msku: count * 10 for msku, count in expected.items()}
+
+def field_processor(processor, column, expression):
+    processor.client = RecordingClient(json.dumps({'column': column, 'expression': expression}))
+    return processor
+
+def priced_frame():
+    return pd.DataFrame({'price': [10.0, 20.0], 'cost': [4.0, 5.0], 'unit count': [2, 3]})
+
+@pytest.mark.parametrize('expression, expected', [
+    ('(price - cost) / price * 100', [60.0, 75.0]),
+    ('price * `unit count` + -cost', [16.0, 55.0]),
+])
+def test_calculated_field_evaluates_arithmetic(processor, expression, expected):
+    df = field_processor(processor, 'result', expression).add_calculated_field(priced_frame(), 'a field')
+
+    assert df['result'].tolist() == expected
+
+@pytest.mark.parametrize('expression', [
+    'price.to_csv()',
+    'price.iloc',
+    'price.abs()',
+    '__import__("os")',
+    'price.__class__',
+    '__class__ + price',
+    'profit = price - cost',
+    'price if cost else 0',
+    '"price" + cost',
+    'price ** 2',
+    'price[0]',
+])
+def test_calculated_field_rejects_non_arithmetic(processor, expression):
+    df = priced_frame()
+
+    result = field_processor(processor, 'result', expression).add_calculated_field(df, 'a field')
+
+    assert result is df
+    pd.testing.assert_frame_equal(df, priced_frame())
+
+BATCH_QUESTIONS = ['which products look unusual', 'how did returns change', 'what sells on weekends']
+
+def test_text_to_sql_batch_uses_one_completion(processor):
+    sql_queries = ["SELECT msku FROM products", "SELECT * FROM returns_data", "SELECT * FROM sales_data"]
+    processor.client = RecordingClient(json.dumps({'queries': sql_queries}))
+
+    results = processor.text_to_sql_batch(BATCH_QUESTIONS + ['show top selling products'])
+
+    assert len(processor.client.calls) == 1
+    assert results[:3] == [(sql_query, True) for sql_query in sql_queries]
+    assert results[3][0].startswith("SELECT msku, SUM(quantity)")
+
+def test_text_to_sql_batch_falls_back_to_one_completion_per_query(processor):
+    processor.client = RecordingClient(json.dumps({'queries': ["SELECT 1"]}), "SELECT msku FROM inventory")
+
+    results = processor.text_to_sql_batch(BATCH_QUESTIONS)
+
+    assert len(processor.client.calls) == 1 + len(BATCH_QUESTIONS)
+    assert results == [("SELECT msku FROM inventory", True)] * len(BATCH_QUESTIONS)
+
+def test_async_sql_shares_normalization_and_cache_with_sync_path(processor, groq_client):
+    aclient = AsyncRecordingClient("SELECT msku FROM inventory")
+
+    result = asyncio.run(processor.text_to_sql_async('  which   warehouse products\nlook unusual ', aclient))
+
+    assert result == ("SELECT msku FROM inventory", True)
+    assert aclient.calls[0]['messages'][-1]['content'] == 'which warehouse products look unusual'
+    assert processor.text_to_sql('which warehouse products look unusual') == result
+    assert asyncio.run(processor.text_to_sql_async('which warehouse products look unusual', aclient)) == result
+    assert len(aclient.calls) == 1
+    assert groq_client.calls == []
+
+def test_async_queries_open_and_close_one_client_per_event_loop(processor, monkeypatch):
+    clients = []
+    def new_client(api_key):
+        clients.append(AsyncRecordingClient("SELECT msku FROM products"))
+        return clients[-1]
+    monkeypatch.setattr(text_to_sql, 'get_async_groq_client', new_client)
+
+    for question in ('which products look unusual', 'how did returns change'):
+        results = asyncio.run(processor.process_natural_queries_async([question, 'show top selling products']))
+        assert [result['success'] for result in results] == [True, True]
+
+    assert [len(client.calls) for client in clients] == [1, 1]
+    assert all(client.closed for client in clients)
+
+@pytest.fixture
+def analyzed_processor(processor, monkeypatch):
+    assert sync(processor, processed_sales(rows=50))
+    monkeypatch.setattr(text_to_sql, 'SLOW_QUERY_ROW_LIMIT', 20)
+    return processor
+
+@pytest.mark.parametrize('sql_query, slow', [
+    ("SELECT * FROM sales_data", True),
+    ("SELECT s.msku, s.total FROM sales_data s", True),
+    ("SELECT s.msku FROM products p JOIN sales_data AS s ON s.order_id = p.product_name", True),
+    ("SELECT * FROM sales_data WHERE msku = 'GEN_1'", False),
+    ("SELECT s.total FROM sales_data s WHERE s.msku = 'GEN_1'", False),
+    ("SELECT * FROM products", False),
+    ("SELECT nope FROM missing_table", False),
+])
+def test_slow_query_guard_reads_plan_and_table_sizes(analyzed_processor, sql_query, slow):
+    assert analyzed_processor._is_slow_query(sql_query) is slow
+
+def test_slow_query_guard_allows_full_scans_below_the_row_limit(processor):
+    assert sync(processor, processed_sales(rows=50))
+
+    assert processor._is_slow_query("SELECT * FROM sales_data") is False
+
+def test_slow_queries_are_rejected_before_running(analyzed_processor):
+    result = analyzed_processor._process_sql("SELECT * FROM sales_data", True)
+
+    assert result['success'] is False
+    assert result['error'] == text_to_sql.SLOW_QUERY_ERROR
+
+class RecordingSession:
+    """requests.Session stand-in that records posted JSON bodies and answers with increasing ids"""
+    def __init__(self):
+        self.posts = []
+
+    def post(self, url, json=None, **kwargs):
+        self.posts.append((url, json))
+        return types.SimpleNamespace(status_code=200, json=lambda: {'id': len(self.posts)})
+
+def test_baserow_table_fields_are_created_in_schema_order():
+    manager = BaserowManager('test-token', base_url='http://baserow.test')
+    manager.session = RecordingSession()
+    fields = [{'name': f'Field {i}', 'type': 'text'} for i in range(12)]
+
+    assert manager.create_table(1, 'products', fields) == {'id': 1}
+
+    field_posts = [body for url, body in manager.session.posts if url.endswith('/fields/')]
+    assert [body['name'] for body in field_posts] == [field['name'] for field in fields]
+    assert {body['table_id'] for body in field_posts} == {1}
@@ -0,0 +1,64 @@
+import io
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from part1_data_cleaning.sku_mapper import SKUMapper
+
+SALES = pd.DataFrame({'SKU': ['AB123', 'XY9', 'CD456', None, 'AB123'], 'Quantity': [1, 2, 3, 4, 5]})
+
+@pytest.fixture
+def sku_mapper():
+    mapper = SKUMapper()
+    mapper.load_master_mappings()
+    return mapper
+
+def feather_round_trip(df):
+    buffer = io.BytesIO()
+    df.reset_index(drop=True).to_feather(buffer, compression='uncompressed')
+    buffer.seek(0)
+    return pd.read_feather(buffer)
+
+def csv_round_trip(df):
+    return pd.read_csv(io.StringIO(df.to_csv(index=False)))
+
+@pytest.mark.parametrize('round_trip', [feather_round_trip, csv_round_trip])
+def test_restore_processed_data_round_trips_categoricals(sku_mapper, round_trip):
+    processed = sku_mapper.process_sales_data(SALES)
+
+    restored_mapper = SKUMapper()
+    restored_mapper.load_master_mappings()
+    restored = restored_mapper.restore_processed_data(round_trip(processed))
+
+    for column in ('MSKU', 'mapping_method'):
+        assert isinstance(restored[column].dtype, pd.CategoricalDtype)
+        assert restored[column].astype(str).tolist() == processed[column].astype(str).tolist()
+    assert restored_mapper.processed_data is restored
+    assert dict(restored_mapper.master_mappings) == dict(sku_mapper.master_mappings)
+
+def test_mapping_digest_follows_mapping_content(sku_mapper):
+    empty_digest = sku_mapper.mapping_digest()
+
+    sku_mapper.master_mappings['MY_MSKU'] = ['AB123']
+    changed_digest = sku_mapper.mapping_digest()
+    assert changed_digest != empty_digest
+
+    other = SKUMapper()
+    other.master_mappings = {'MY_MSKU': ['AB123']}
+    assert other.mapping_digest() == changed_digest
+
+    sku_mapper.load_master_mappings()
+    assert sku_mapper.mapping_digest() == empty_digest
+
+def test_explicit_mappings_win_over_generated_categories(sku_mapper):
+    sku_mapper.master_mappings['MY_MSKU'] = ['AB123']
+
+    processed = sku_mapper.process_sales_data(SALES)
+
+    assert processed['MSKU'].astype(str).tolist()[:3] == ['MY_MSKU', sku_mapper._categorize_sku('XY9'),
+                                                          sku_mapper._categorize_sku('CD456')]
+    assert processed['MSKU'].iloc[3] == 'UNCATEGORIZED_UNKNOWN'
@@ -0,0 +1,198 @@
+import io
+import json
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from part1_data_cleaning.sku_mapper import SKUMapper
+from part3_web_app import app as web_app
+from part4_ai_layer.text_to_sql import SQLQueryProcessor
+from tests.test_database import RecordingClient
+
+SALES_CSV = b"SKU,Quantity\nAB123,1\nXY9,2\nCD456,3\n"
+
+def fresh_mapper():
+    mapper = SKUMapper()
+    mapper.load_master_mappings()
+    return mapper
+
+@pytest.fixture
+def sku_mapper():
+    return fresh_mapper()
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, sku_mapper):
+    monkeypatch.setitem(web_app.app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setattr(web_app, 'get_sku_mapper', lambda: sku_mapper)
+    monkeypatch.setattr(web_app, 'get_ai_processors', lambda: (None, None))
+    web_app.app.config['TESTING'] = True
+    return web_app.app.test_client()
+
+@pytest.fixture
+def process_calls(monkeypatch, sku_mapper):
+    calls = []
+    process_sales_data = sku_mapper.process_sales_data
+    def spy(df):
+        calls.append(len(df))
+        return process_sales_data(df)
+    monkeypatch.setattr(sku_mapper, 'process_sales_data', spy)
+    return calls
+
+def upload(client):
+    response = client.post('/upload', data={'file': (io.BytesIO(SALES_CSV), 'sales.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    for filename in list(web_app.pending_writes):
+        web_app.wait_for_processed_file(filename)
+    return response
+
+def msku_for(sku_mapper, sku):
+    df = sku_mapper.processed_data
+    return str(df.loc[df['SKU'] == sku, 'MSKU'].iloc[0])
+
+def test_reupload_hits_once_mapper_holds_the_upload_categories(client, sku_mapper, process_calls):
+    upload(client)
+    upload(client)
+    upload(client)
+
+    assert process_calls == [3, 3]
+    assert msku_for(sku_mapper, 'AB123') == 'ALPHANUMERIC_TYPE_AB'
+
+def test_reupload_from_fresh_mapper_reuses_processed_output(client, monkeypatch, process_calls):
+    upload(client)
+
+    for _ in range(2):
+        restarted_mapper = fresh_mapper()
+        monkeypatch.setattr(restarted_mapper, 'process_sales_data', lambda df: pytest.fail('upload was reprocessed'))
+        monkeypatch.setattr(web_app, 'get_sku_mapper', lambda: restarted_mapper)
+        upload(client)
+        assert msku_for(restarted_mapper, 'AB123') == 'ALPHANUMERIC_TYPE_AB'
+
+    assert process_calls == [3]
+
+def test_reupload_after_mapping_change_reprocesses(client, sku_mapper, monkeypatch, process_calls):
+    upload(client)
+
+    sku_mapper.load_master_mappings()
+    sku_mapper.master_mappings['MY_MSKU'] = ['AB123']
+    upload(client)
+
+    assert process_calls == [3, 3]
+    assert msku_for(sku_mapper, 'AB123') == 'MY_MSKU'
+
+    restarted_mapper = fresh_mapper()
+    restarted_mapper.master_mappings['MY_MSKU'] = ['AB123']
+    monkeypatch.setattr(restarted_mapper, 'process_sales_data', lambda df: pytest.fail('upload was reprocessed'))
+    monkeypatch.setattr(web_app, 'get_sku_mapper', lambda: restarted_mapper)
+    upload(client)
+    assert msku_for(restarted_mapper, 'AB123') == 'MY_MSKU'
+
+def test_processed_outputs_are_moved_into_place(client, tmp_path):
+    upload(client)
+
+    names = os.listdir(tmp_path)
+    assert any(name.startswith('processed_') and name.endswith('.feather') for name in names)
+    assert not any(name.endswith('.tmp') for name in names)
+
+def test_failed_processed_write_leaves_no_partial_file(tmp_path, monkeypatch, caplog):
+    import pandas as pd
+
+    def failing_to_csv(self, sink, **kwargs):
+        sink.write(b"SKU,Quantity\n")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(web_app, 'pyarrow_available', False)
+    monkeypatch.setattr(pd.DataFrame, 'to_csv', failing_to_csv)
+    filepath = str(tmp_path / 'processed_partial.csv')
+    web_app.save_processed_files_async(pd.DataFrame({'SKU': ['AB123']}), filepath, 'processed_partial.csv')
+    future = web_app.pending_writes['processed_partial.csv']
+    with pytest.raises(OSError):
+        future.result()
+    deadline = time.monotonic() + 5
+    while 'processed_partial.csv' in web_app.pending_writes and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert os.listdir(tmp_path) == []
+    assert 'processed_partial.csv' not in web_app.pending_writes
+    assert 'Failed to write processed file processed_partial.csv' in caplog.text
+
+@pytest.fixture
+def sql_processor(tmp_path, monkeypatch):
+    processor = SQLQueryProcessor(api_key='test-key', db_path=str(tmp_path / 'wms.db'),
+                                  client=RecordingClient("SELECT missing_column FROM products"))
+    processor.insert_sample_data()
+    monkeypatch.setattr(web_app, 'get_ai_processors', lambda: (None, processor))
+    yield processor
+    processor.conn.close()
+
+def stream_lines(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+def test_ai_query_stream_sends_header_then_row_batches(client, sql_processor):
+    response = client.post('/api/ai-query-stream', json={'query': 'show top selling products'})
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    header, *batches = stream_lines(response)
+    assert header['success'] and header['columns'] == ['msku', 'total_sold']
+    rows = [row for batch in batches for row in batch]
+    assert rows and set(rows[0]) == {'msku', 'total_sold'}
+
+def test_ai_query_stream_reports_sql_errors_in_the_stream(client, sql_processor):
+    response = client.post('/api/ai-query-stream', json={'query': 'which products look unusual'})
+
+    assert response.status_code == 200
+    [header] = stream_lines(response)
+    assert header['success'] is False
+    assert 'missing_column' in header['error']
+
+@pytest.mark.parametrize('kwargs, status', [
+    ({'data': 'not json', 'content_type': 'text/plain'}, 500),
+    ({'data': 'null', 'content_type': 'application/json'}, 500),
+    ({'json': {'query': '  '}}, 400),
+])
+def test_ai_query_stream_rejects_bad_requests_as_json(client, sql_processor, kwargs, status):
+    response = client.post('/api/ai-query-stream', **kwargs)
+
+    assert response.status_code == status
+    assert response.get_json()['success'] is False
+
+def test_processed_csv_matches_dataframe_to_csv_format(tmp_path):
+    import pandas as pd
+
+    df = pd.DataFrame({
+        'SKU': ['AB123', 'a,b', None],
+        'Quantity': [1, 2, 3],
+        'Price': [3.0, None, 0.1],
+        'Order Date': pd.to_datetime(['2024-01-01', '2024-01-02 10:30', None], format='mixed'),
+        'MSKU': pd.Categorical(['ALPHANUMERIC_TYPE_AB', 'OTHER', 'UNCATEGORIZED_UNKNOWN']),
+    })
+    filepath = str(tmp_path / 'processed.csv')
+
+    web_app.write_csv(df, filepath)
+    with web_app.open_stored_input(filepath) as source:
+        text = source.read().decode()
+
+    assert text.splitlines() == [
+        'SKU,Quantity,Price,Order Date,MSKU',
+        'AB123,1,3.0,2024-01-01 00:00:00,ALPHANUMERIC_TYPE_AB',
+        '"a,b",2,,2024-01-02 10:30:00,OTHER',
+        ',3,0.1,,UNCATEGORIZED_UNKNOWN',
+    ]
+    assert text == df.to_csv(index=False)
+
+def test_download_serves_the_processed_csv(client, tmp_path):
+    upload(client)
+    [filename] = [name for name in os.listdir(tmp_path) if name.startswith('processed_') and name.endswith('.feather')]
+
+    response = client.get(f"/download/{filename[:-len('.feather')]}")
+
+    assert response.status_code == 200
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0] == 'SKU,Quantity,MSKU,processed_at,mapping_method'
+    assert lines[1].startswith('AB123,1,ALPHANUMERIC_TYPE_AB,')
+    assert lines[1].endswith(',intelligent_auto')
@@ -0,0 +1 @@
+from src.part3_web_app.app import app